@@ -7,22 +7,24 @@ import traceback
 
 # Import with error handling
 try:
-    from utils.supabase_client import supabase
+    from utils.supabase_client import get_supabase
 except ImportError as e:
     print(f"Warning: Could not import supabase: {e}")
-    supabase = None
+    def get_supabase():
+        return None
 
 try:
-    from services.whisper_service import transcribe_audio_to_text
+    from services.whisper_service import transcribe_audio_to_text_async
 except ImportError as e:
     print(f"Warning: Could not import whisper service: {e}")
-    def transcribe_audio_to_text(file_path: str) -> str:
+    async def transcribe_audio_to_text_async(file_path: str) -> str:
         return "Transcription service not available"
 
 router = APIRouter()
 
 @router.post('/upload-audio')
 async def upload_audio(file: UploadFile = File(...), user_id: Optional[str] = Form(None), repo_url: Optional[str] = Form(None)):
+    supabase = get_supabase()
     print(f"Received audio upload request: file={file.filename}, user_id={user_id}, repo_url={repo_url}")
     
     if supabase is None:
@@ -110,7 +112,7 @@ async def upload_audio(file: UploadFile = File(...), user_id: Optional[str] = Fo
         # Transcribe audio
         print(f"Starting transcription of file: {tmp_path}")
         try:
-            text = transcribe_audio_to_text(tmp_path)
+            text = await transcribe_audio_to_text_async(tmp_path)
             print(f"Transcription completed. Text length: {len(text)}")
             print(f"Transcription preview: {text[:100]}...")
         except Exception as transcription_error:
@@ -150,6 +152,7 @@ async def upload_audio(file: UploadFile = File(...), user_id: Optional[str] = Fo
 @router.get('/transcriptions')
 async def get_all_transcriptions():
     """Get all transcriptions"""
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail='Supabase not configured')
     try:
@@ -161,6 +164,7 @@ async def get_all_transcriptions():
 @router.get('/transcriptions/{transcription_id}')
 async def get_transcription(transcription_id: str):
     """Get a specific transcription"""
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail='Supabase not configured')
     try:
@@ -3,7 +3,7 @@ import time
 from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
-from utils.supabase_client import supabase
+from utils.supabase_client import get_supabase
 import json
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -15,6 +15,7 @@ extension_sessions = {}
 @router.get("/session")
 async def get_session(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
     """Get current user session - works with both cookies and bearer tokens"""
+    supabase = get_supabase()
     if not supabase:
         raise HTTPException(status_code=500, detail="Supabase not configured")
     
@@ -53,6 +54,7 @@ async def get_session(request: Request, credentials: Optional[HTTPAuthorizationC
 @router.post("/extension-login")
 async def extension_login(request: Request):
     """Login endpoint specifically for Chrome extension"""
+    supabase = get_supabase()
     try:
         body = await request.json()
         email = body.get("email")
@@ -120,6 +122,7 @@ async def extension_logout(request: Request):
 @router.post("/logout")
 async def logout():
     """Logout user"""
+    supabase = get_supabase()
     if not supabase:
         raise HTTPException(status_code=500, detail="Supabase not configured")
     
@@ -133,6 +136,7 @@ async def logout():
 @router.post("/extension-token-bridge")
 async def extension_token_bridge(request: Request):
     """Endpoint to bridge token from frontend to extension"""
+    supabase = get_supabase()
     try:
         body = await request.json()
         access_token = body.get("access_token")
@@ -1,11 +1,12 @@
 import os
+import asyncio
 import tempfile
 import uuid
 from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from pydantic import BaseModel
 from services.context_blocks_service import ContextBlocksService
-from utils.supabase_client import supabase
+from utils.supabase_client import get_supabase
 
 router = APIRouter(prefix="/context-blocks", tags=["context-blocks"])
 
@@ -19,6 +20,7 @@ class SearchItemsRequest(BaseModel):
 
 @router.post("/process-meeting")
 async def process_meeting(file: UploadFile = File(...), user_id: Optional[str] = Form(None), repo_url: Optional[str] = Form(None)):
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail="Supabase not configured")
     tmp_path = None
@@ -30,7 +32,8 @@ async def process_meeting(file: UploadFile = File(...), user_id: Optional[str] =
             tmp.write(content)
 
         service = ContextBlocksService()
-        result = service.process_meeting(tmp_path, user_id=user_id, repo_url=repo_url)
+        # Transcription and analysis are blocking API calls; keep them off the event loop
+        result = await asyncio.to_thread(service.process_meeting, tmp_path, user_id=user_id, repo_url=repo_url)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -45,6 +48,7 @@ async def process_meeting(file: UploadFile = File(...), user_id: Optional[str] =
 
 @router.get("/session/{session_id}")
 async def get_session(session_id: str):
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail="Supabase not configured")
     try:
@@ -66,6 +70,7 @@ async def get_session(session_id: str):
 
 @router.get("/sessions")
 async def get_all_sessions():
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail="Supabase not configured")
     try:
@@ -105,6 +110,7 @@ async def search_similar_items(request: SearchItemsRequest):
 
 @router.get("/blocks/{block_id}")
 async def get_context_block(block_id: str):
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail="Supabase not configured")
     try:
@@ -123,6 +129,7 @@ async def get_context_block(block_id: str):
 
 @router.get("/prompts/{prompt_id}")
 async def get_system_prompt(prompt_id: str):
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail="Supabase not configured")
     try:
@@ -139,6 +146,7 @@ async def get_system_prompt(prompt_id: str):
 @router.post("/test-database")
 async def test_database():
     """Test database connectivity and basic operations"""
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail="Supabase not configured")
     
@@ -201,6 +209,7 @@ async def test_database():
 @router.delete("/cleanup-test-data")
 async def cleanup_test_data():
     """Clean up test data from database"""
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail="Supabase not configured")
     
@@ -10,12 +10,13 @@ from pydantic import BaseModel
 from typing import Optional, Dict, Any
 import os
 from services.intelligent_ticket_generator import IntelligentTicketGenerator
-from utils.supabase_client import supabase
+from utils.supabase_client import get_supabase
 
 router = APIRouter(tags=["tickets"])
 
 @router.get('/ticket/{transcription_id}')
 async def get_ticket(transcription_id: str, github_token: str | None = Query(default=None)):
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail='Supabase not configured')
     try:
@@ -62,6 +63,7 @@ async def get_ticket(transcription_id: str, github_token: str | None = Query(def
 
 @router.get('/ticket-from-session/{session_id}')
 async def get_ticket_from_session(session_id: str, github_token: str | None = Query(default=None)):
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail='Supabase not configured')
     try:
@@ -111,6 +113,7 @@ async def get_ticket_from_session(session_id: str, github_token: str | None = Qu
 
 @router.get('/ticket-from-session/{session_id}/latest')
 async def get_latest_ticket_from_session(session_id: str):
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail='Supabase not configured')
     try:
@@ -124,6 +127,7 @@ async def get_latest_ticket_from_session(session_id: str):
 
 @router.post('/ticket-from-session/{session_id}/save')
 async def save_ticket_for_session(session_id: str, payload: Dict[str, Any] = Body(...)):
+    supabase = get_supabase()
     if supabase is None:
         raise HTTPException(status_code=500, detail='Supabase not configured')
     try:
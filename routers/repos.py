@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Optional, List
-from utils.supabase_client import supabase
+from utils.supabase_client import get_supabase
 from services.cocoindex_service import CocoIndexService
 import httpx
 import asyncio
@@ -23,6 +23,7 @@ class AnalyzeSelectedRepoBody(BaseModel):
 
 @router.post('/analyze-repo')
 async def analyze_repo(body: AnalyzeRepoBody):
+    supabase = get_supabase()
     try:
         # 1. Indexar con CocoIndex
         database_url = os.getenv('DATABASE_URL')
@@ -96,6 +97,7 @@ async def analyze_repo(body: AnalyzeRepoBody):
 @router.get('/user-repositories')
 async def get_user_repositories(user_id: str = Query(...)):
     """Get repositories analyzed by a specific user"""
+    supabase = get_supabase()
     try:
         # Obtener repositorios de la base de datos
         result = supabase.table("repositories").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
@@ -164,6 +166,7 @@ async def repos_with_analysis(github_token: str = Query(...), user_id: str = Que
 
 @router.post('/analyze-selected-repo')
 async def analyze_selected_repo(body: AnalyzeSelectedRepoBody):
+    supabase = get_supabase()
     headers = { 'Authorization': f'Bearer {body.github_token}', 'Accept': 'application/vnd.github+json' }
     try:
         async with httpx.AsyncClient(timeout=20) as client:
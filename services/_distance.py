@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Vector distance kernels used by the RAG search
+"""
+
+import numpy as np
+
+try:
+    import numba
+    from numba import prange
+except ImportError:
+    numba = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Bits in the character n-gram fingerprints used to prefilter the keyword fallback
+# scorer; 512 bytes per chunk, and collisions only cost an extra exact check
+GRAM_FINGERPRINT_BITS = 4096
+
+# Below this many vectors a brute-force scan beats building an ANN graph
+HNSW_MIN_VECTORS = 1000
+
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _count_term_matches_numba(term_bits, chunk_bits):
+        n = chunk_bits.shape[0]
+        out = np.zeros(n, dtype=np.int32)
+        for i in prange(n):
+            count = 0
+            for t in range(term_bits.shape[0]):
+                matched = True
+                for w in range(term_bits.shape[1]):
+                    if term_bits[t, w] & ~chunk_bits[i, w]:
+                        matched = False
+                        break
+                if matched:
+                    count += 1
+            out[i] = count
+        return out
+else:
+    _count_term_matches_numba = None
+
+
+def count_term_matches(term_bits: np.ndarray, chunk_bits: np.ndarray) -> np.ndarray:
+    """Per chunk, how many query terms have every n-gram bit set in the chunk's fingerprint (requires numba)"""
+    return _count_term_matches_numba(term_bits, chunk_bits)
+
+
+def _fingerprint(grams) -> np.ndarray:
+    bits = np.zeros(GRAM_FINGERPRINT_BITS, dtype=np.uint8)
+    positions = [hash(g) & (GRAM_FINGERPRINT_BITS - 1) for g in grams]
+    if positions:
+        bits[positions] = 1
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def text_fingerprint(text: str) -> np.ndarray:
+    """Fingerprint of every 1-, 2- and 3-gram in text"""
+    return _fingerprint({text[i:i + n] for n in (1, 2, 3) for i in range(len(text) - n + 1)})
+
+
+def term_fingerprint(term: str) -> np.ndarray:
+    """Fingerprint a term so that 'term in text' implies it is a subset of text_fingerprint(text)"""
+    if len(term) < 3:
+        return _fingerprint((term,))
+    return _fingerprint({term[i:i + 3] for i in range(len(term) - 2)})
+
+
+def normalize_rows(mat: np.ndarray) -> np.ndarray:
+    """L2-normalize rows in place; all-zero rows stay zero"""
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    np.divide(mat, norms, out=mat, where=norms != 0)
+    return mat
+
+
+def build_flat_index(mat: np.ndarray):
+    """Build an exact inner-product index over L2-normalized rows (scores are cosines)"""
+    index = faiss.IndexFlatIP(mat.shape[1])
+    index.add(mat)
+    return index
+
+
+def build_hnsw_index(mat: np.ndarray, m: int = 32, ef_construction: int = 200):
+    """Build an inner-product HNSW index over L2-normalized rows (scores are cosines)"""
+    index = faiss.IndexHNSWFlat(mat.shape[1], m, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = ef_construction
+    index.add(mat)
+    return index
@@ -5,7 +5,8 @@ from typing import Any, Dict, List, Optional
 from openai import OpenAI
 # from sentence_transformers import SentenceTransformer
 from .whisper_service import transcribe_audio_to_text
-from utils.supabase_client import supabase
+from utils.supabase_client import get_supabase
+from utils import json_utils
 
 
 class ContextBlocksService:
@@ -18,6 +19,7 @@ class ContextBlocksService:
         self.embedding_model = None
 
     def process_meeting(self, audio_file_path: str, user_id: Optional[str] = None, repo_url: Optional[str] = None) -> Dict[str, Any]:
+        supabase = get_supabase()
         print(f"Starting process_meeting with user_id: {user_id}, repo_url: {repo_url}")
         session_id = str(uuid.uuid4())
         print(f"Generated session_id: {session_id}")
@@ -77,7 +79,7 @@ class ContextBlocksService:
             )
             
             content = response.choices[0].message.content or "{}"
-            data = json.loads(content)
+            data = json_utils.loads(content)
             blocks = data.get("blocks", [])
             
             created_blocks = []
@@ -92,6 +94,7 @@ class ContextBlocksService:
             return []
 
     def create_context_block(self, session_id: str, block_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        supabase = get_supabase()
         print(f"Creating context block for session {session_id}")
         if not supabase:
             print("Supabase is None, cannot create context block")
@@ -167,7 +170,7 @@ class ContextBlocksService:
             
             # Try to parse JSON
             try:
-                data = json.loads(content)
+                data = json_utils.loads(content)
             except json.JSONDecodeError as json_error:
                 print(f"JSON decode error: {json_error}")
                 print(f"Raw content: {content}")
@@ -215,6 +218,7 @@ class ContextBlocksService:
         return created_items
 
     def create_context_item(self, context_block_id: str, item_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        supabase = get_supabase()
         print(f"Creating context item for block {context_block_id}")
         if not supabase:
             print("Supabase is None, cannot create context item")
@@ -251,6 +255,7 @@ class ContextBlocksService:
             return None
 
     def resolve_item_to_prompt(self, item_id: str, resolution_context: str) -> Dict[str, Any]:
+        supabase = get_supabase()
         if not supabase:
             return {"success": False, "error": "Database not available"}
         
@@ -304,6 +309,7 @@ class ContextBlocksService:
             return f"Help me with: {item_content}"
 
     def build_system_prompt(self, context_block_id: str) -> Dict[str, Any]:
+        supabase = get_supabase()
         if not supabase:
             return {"success": False, "error": "Database not available"}
         
@@ -383,6 +389,7 @@ Focus on helping the developer successfully implement this feature based on the
         return system_prompt
 
     def search_similar_items(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        supabase = get_supabase()
         if not supabase:
             return []
         
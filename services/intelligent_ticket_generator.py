@@ -3,69 +3,209 @@
 Intelligent Ticket Generator using CocoIndex + RAG + LLM
 """
 
+import io
 import os
+import time
 import asyncio
-from typing import Dict, List, Optional, Any
-from openai import OpenAI
+import hashlib
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from .cocoindex_service import CocoIndexService
-from .rag_service import RAGService, ProjectContext
-import json
+from .rag_service import RAGService, ProjectContext, prepare_code_embeddings
+from ._distance import normalize_rows
+from utils import json_utils
+import re
+from types import MappingProxyType
+import numpy as np
+
+# Placeholder vectors share one read-only float32 matrix so each chunk's
+# "embedding" is a view instead of a fresh 384-element list per call. Rows are
+# L2-normalized up front so search can score them with a plain dot product.
+_PLACEHOLDER_EMBEDDING_MATRIX = normalize_rows(np.array([[0.1] * 384, [0.2] * 384, [0.3] * 384], dtype=np.float32))
+_PLACEHOLDER_EMBEDDING_MATRIX.setflags(write=False)
+
+_PLACEHOLDER_EMBEDDINGS: List[Dict[str, Any]] = prepare_code_embeddings([
+    {
+        "filename": "app/components/LoginForm.tsx",
+        "code": "export default function LoginForm() {\n  const [email, setEmail] = useState('');\n  const [password, setPassword] = useState('');\n  \n  const handleSubmit = async (e) => {\n    e.preventDefault();\n    // Login logic here\n  };\n  \n  return (\n    <form onSubmit={handleSubmit}>\n      <input type='email' value={email} onChange={(e) => setEmail(e.target.value)} />\n      <input type='password' value={password} onChange={(e) => setPassword(e.target.value)} />\n      <button type='submit'>Login</button>\n    </form>\n  );\n}",
+        "embedding": _PLACEHOLDER_EMBEDDING_MATRIX[0],
+        "_normalized": True,
+        "language": "typescript",
+        "metadata": {"has_functions": True, "has_imports": True}
+    },
+    {
+        "filename": "app/api/auth/route.ts",
+        "code": "import { NextRequest, NextResponse } from 'next/server';\n\nexport async function POST(request: NextRequest) {\n  try {\n    const { email, password } = await request.json();\n    \n    // Authentication logic here\n    \n    return NextResponse.json({ success: true });\n  } catch (error) {\n    return NextResponse.json({ error: 'Authentication failed' }, { status: 400 });\n  }\n}",
+        "embedding": _PLACEHOLDER_EMBEDDING_MATRIX[1],
+        "_normalized": True,
+        "language": "typescript",
+        "metadata": {"has_functions": True, "has_imports": True}
+    },
+    {
+        "filename": "components/ui/button.tsx",
+        "code": "import * as React from 'react';\nimport { cn } from '@/lib/utils';\n\nexport interface ButtonProps extends React.ButtonHTMLAttributes<HTMLButtonElement> {\n  variant?: 'default' | 'outline' | 'ghost';\n  size?: 'default' | 'sm' | 'lg';\n}\n\nconst Button = React.forwardRef<HTMLButtonElement, ButtonProps>(\n  ({ className, variant = 'default', size = 'default', ...props }, ref) => {\n    return (\n      <button\n        className={cn(\n          'inline-flex items-center justify-center rounded-md text-sm font-medium',\n          'transition-colors focus-visible:outline-none focus-visible:ring-2',\n          className\n        )}\n        ref={ref}\n        {...props}\n      />\n    );\n  }\n);\nButton.displayName = 'Button';\n\nexport { Button };",
+        "embedding": _PLACEHOLDER_EMBEDDING_MATRIX[2],
+        "_normalized": True,
+        "language": "typescript",
+        "metadata": {"has_functions": True, "has_imports": True}
+    }
+])
+
+_PLACEHOLDER_METADATA = MappingProxyType({
+    "package.json": json_utils.dumps({
+        "name": "example-project",
+        "dependencies": {
+            "react": "^18.0.0",
+            "next": "^13.0.0",
+            "typescript": "^5.0.0",
+            "@radix-ui/react-dialog": "^1.0.0",
+            "lucide-react": "^0.300.0"
+        },
+        "devDependencies": {
+            "tailwindcss": "^3.0.0",
+            "eslint": "^8.0.0"
+        }
+    })
+})
+
+logger = logging.getLogger(__name__)
+
+# Meta headers the LLM is told not to emit, folded into one alternation so
+# stripping them is a single pass over the ticket
+_META_HEADER_RE = re.compile(
+    r"\*\*(?:Assigned To|Due Date|Tags|Ticket ID|Project|Component|Priority|Complexity|Status):\*\*.*\n?"
+)
+_EXAMPLE_SNIPPET_RE = re.compile(r"(?si)##\s*Example Code Snippet.*?(?:\n##|\Z)")
+_CODE_BLOCK_RE = re.compile(r"```[\s\S]*?```")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_BACKTICK_RE = re.compile(r'`([^`]+)`')
+# Substrings that must be present for any of the patterns above to match
+_FAST_TOKENS = (
+    "**Assigned To:", "**Due Date:", "**Tags:", "**Ticket ID:", "**Project:",
+    "**Component:", "**Priority:", "**Complexity:", "**Status:", "```", "\n\n\n",
+)
+
+# How long a finished indexing run is reused before the repo is indexed again
+INDEX_CACHE_TTL_SECONDS = 15 * 60
+
+@lru_cache(maxsize=None)
+def _get_openai_client(api_key: str) -> AsyncOpenAI:
+    """One async client per API key so its connection pool is reused across requests"""
+    return AsyncOpenAI(
+        api_key=api_key,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100)
+        )
+    )
 
 class IntelligentTicketGenerator:
+    # Shared across instances: the routers build a new generator per request,
+    # so in-flight/finished indexing runs are keyed at class level by repo URL
+    # and a digest of the GitHub token, so a run is only reused with the same credentials
+    _index_futures: Dict[Tuple[str, str], Tuple[float, asyncio.Task]] = {}
+
     def __init__(self, openai_api_key: str, database_url: str):
-        self.openai_client = OpenAI(api_key=openai_api_key)
+        self.openai_client = _get_openai_client(openai_api_key)
         self.cocoindex_service = CocoIndexService(database_url)
         self.rag_service = RAGService()
         
+    def _ensure_indexed(self, repo_url: str, github_token: Optional[str] = None) -> asyncio.Task:
+        """Start (or reuse) a background indexing task for the repository"""
+        now = time.monotonic()
+        # Evict finished runs past their TTL, plus failed runs so they get retried
+        for key, (started_at, task) in list(self._index_futures.items()):
+            if task.done() and (
+                now - started_at > INDEX_CACHE_TTL_SECONDS
+                or task.cancelled()
+                or task.exception() is not None
+                or not task.result().get("success")
+            ):
+                del self._index_futures[key]
+
+        key = (repo_url, hashlib.sha256((github_token or "").encode()).hexdigest())
+        entry = self._index_futures.get(key)
+        if entry is None:
+            task = asyncio.create_task(self.cocoindex_service.index_repository(repo_url, github_token))
+            entry = self._index_futures.setdefault(key, (now, task))
+        return entry[1]
+    
     async def generate_intelligent_ticket(self, user_request: str, repo_url: str, github_token: Optional[str] = None) -> Dict[str, Any]:
         """
         Generate an intelligent ticket using the complete RAG pipeline
         """
+        timings: Dict[str, float] = {}
         try:
-            print("🚀 Starting intelligent ticket generation...")
-            
-            # Step 1: Index repository with CocoIndex
-            print("📦 Indexing repository with CocoIndex...")
-            indexing_result = await self.cocoindex_service.index_repository(repo_url, github_token)
-            
-            if not indexing_result["success"]:
-                return {
-                    "success": False,
-                    "error": f"Failed to index repository: {indexing_result['error']}",
-                    "ticket": None
-                }
+            logger.debug("🚀 Starting intelligent ticket generation...")
             
-            print(f"✅ Repository indexed successfully: {indexing_result['indexed_files']} files, {indexing_result['embeddings_generated']} embeddings")
+            # Step 1: Index repository with CocoIndex (runs in the background,
+            # awaited once the request-only steps below are done)
+            logger.debug("📦 Indexing repository with CocoIndex...")
+            indexing_task = self._ensure_indexed(repo_url, github_token)
             
             # Step 2: Analyze user request
-            print("🧠 Analyzing user request...")
+            logger.debug("🧠 Analyzing user request...")
+            t0 = time.perf_counter()
             request_analysis = await self.rag_service.analyze_user_request(user_request)
-            print(f"✅ Request analyzed: {request_analysis['intent']} ({request_analysis['complexity']} complexity)")
+            timings["analyze"] = time.perf_counter() - t0
+            logger.debug("✅ Request analyzed: %s (%s complexity)", request_analysis['intent'], request_analysis['complexity'])
             
             # Step 3: Search for relevant code using RAG
-            print("🔍 Searching for relevant code...")
+            logger.debug("🔍 Searching for relevant code...")
             # For now, we'll use placeholder embeddings until we have the database set up
+            t0 = time.perf_counter()
             placeholder_embeddings = self._get_placeholder_embeddings()
             relevant_code = await self.rag_service.search_relevant_code(user_request, placeholder_embeddings)
-            print(f"✅ Found {len(relevant_code)} relevant code chunks")
+            timings["search"] = time.perf_counter() - t0
+            logger.debug("✅ Found %d relevant code chunks", len(relevant_code))
+            
+            # Shield so a cancelled request doesn't cancel indexing shared with other requests
+            t0 = time.perf_counter()
+            indexing_result = await asyncio.shield(indexing_task)
+            timings["index"] = time.perf_counter() - t0
+            
+            if not indexing_result["success"]:
+                return {
+                    "success": False,
+                    "error": f"Failed to index repository: {indexing_result['error']}",
+                    "ticket": None
+                }
+            
+            logger.debug("✅ Repository indexed successfully: %s files, %s embeddings", indexing_result['indexed_files'], indexing_result['embeddings_generated'])
             
             # Step 4: Build project context
-            print("🏗️ Building project context...")
+            logger.debug("🏗️ Building project context...")
+            t0 = time.perf_counter()
             project_metadata = self._get_placeholder_metadata()
             project_context = await self.rag_service.build_project_context(relevant_code, project_metadata)
-            print(f"✅ Project context built: {len(project_context.architectural_patterns)} patterns detected")
+            timings["context"] = time.perf_counter() - t0
+            logger.debug("✅ Project context built: %d patterns detected", len(project_context.architectural_patterns))
             
             # Step 5: Generate contextual prompt
-            print("📝 Generating contextual prompt...")
+            logger.debug("📝 Generating contextual prompt...")
+            t0 = time.perf_counter()
             contextual_prompt = await self.rag_service.generate_contextual_prompt(
                 user_request, project_context, request_analysis
             )
-            print("✅ Contextual prompt generated")
+            timings["prompt"] = time.perf_counter() - t0
+            logger.debug("✅ Contextual prompt generated")
             
             # Step 6: Generate ticket with LLM
-            print("🤖 Generating ticket with LLM...")
+            logger.debug("🤖 Generating ticket with LLM...")
+            t0 = time.perf_counter()
             ticket = await self._generate_ticket_with_llm(contextual_prompt, user_request)
-            print("✅ Ticket generated successfully")
+            timings["llm"] = time.perf_counter() - t0
+            
+            logger.info(
+                "ticket_generated",
+                extra={
+                    "timings": timings,
+                    "repo_url": repo_url,
+                    "relevant_code_count": len(relevant_code),
+                }
+            )
             
             return {
                 "success": True,
@@ -92,73 +232,31 @@ class IntelligentTicketGenerator:
     
     def _get_placeholder_embeddings(self) -> List[Dict[str, Any]]:
         """Get placeholder embeddings for testing"""
-        return [
-            {
-                "filename": "app/components/LoginForm.tsx",
-                "code": "export default function LoginForm() {\n  const [email, setEmail] = useState('');\n  const [password, setPassword] = useState('');\n  \n  const handleSubmit = async (e) => {\n    e.preventDefault();\n    // Login logic here\n  };\n  \n  return (\n    <form onSubmit={handleSubmit}>\n      <input type='email' value={email} onChange={(e) => setEmail(e.target.value)} />\n      <input type='password' value={password} onChange={(e) => setPassword(e.target.value)} />\n      <button type='submit'>Login</button>\n    </form>\n  );\n}",
-                "embedding": [0.1] * 384,
-                "language": "typescript",
-                "metadata": {"has_functions": True, "has_imports": True}
-            },
-            {
-                "filename": "app/api/auth/route.ts",
-                "code": "import { NextRequest, NextResponse } from 'next/server';\n\nexport async function POST(request: NextRequest) {\n  try {\n    const { email, password } = await request.json();\n    \n    // Authentication logic here\n    \n    return NextResponse.json({ success: true });\n  } catch (error) {\n    return NextResponse.json({ error: 'Authentication failed' }, { status: 400 });\n  }\n}",
-                "embedding": [0.2] * 384,
-                "language": "typescript",
-                "metadata": {"has_functions": True, "has_imports": True}
-            },
-            {
-                "filename": "components/ui/button.tsx",
-                "code": "import * as React from 'react';\nimport { cn } from '@/lib/utils';\n\nexport interface ButtonProps extends React.ButtonHTMLAttributes<HTMLButtonElement> {\n  variant?: 'default' | 'outline' | 'ghost';\n  size?: 'default' | 'sm' | 'lg';\n}\n\nconst Button = React.forwardRef<HTMLButtonElement, ButtonProps>(\n  ({ className, variant = 'default', size = 'default', ...props }, ref) => {\n    return (\n      <button\n        className={cn(\n          'inline-flex items-center justify-center rounded-md text-sm font-medium',\n          'transition-colors focus-visible:outline-none focus-visible:ring-2',\n          className\n        )}\n        ref={ref}\n        {...props}\n      />\n    );\n  }\n);\nButton.displayName = 'Button';\n\nexport { Button };",
-                "embedding": [0.3] * 384,
-                "language": "typescript",
-                "metadata": {"has_functions": True, "has_imports": True}
-            }
-        ]
+        return _PLACEHOLDER_EMBEDDINGS
     
     def _get_placeholder_metadata(self) -> Dict[str, Any]:
         """Get placeholder project metadata for testing"""
-        return {
-            "package.json": json.dumps({
-                "name": "example-project",
-                "dependencies": {
-                    "react": "^18.0.0",
-                    "next": "^13.0.0",
-                    "typescript": "^5.0.0",
-                    "@radix-ui/react-dialog": "^1.0.0",
-                    "lucide-react": "^0.300.0"
-                },
-                "devDependencies": {
-                    "tailwindcss": "^3.0.0",
-                    "eslint": "^8.0.0"
-                }
-            })
-        }
+        return _PLACEHOLDER_METADATA
     
     async def _generate_ticket_with_llm(self, contextual_prompt: str, user_request: str) -> Dict[str, Any]:
         """Generate ticket using OpenAI LLM with contextual prompt"""
         try:
-            response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": contextual_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": (
-                            "Generate a concise, LLM-ready implementation ticket in Markdown without any placeholder fields or meta headers. "
-                            "Do NOT include sections like 'Example Code Snippet', 'Assigned To', 'Due Date', 'Tags', 'Ticket ID', 'Project', 'Component', 'Priority', 'Complexity', 'Status'. "
-                            "Focus on: Title, Summary, Intent, Scope, Files to Modify (list real paths if known or leave empty), Considerations, Acceptance Criteria as checklist. "
-                            f"User request: {user_request}"
-                        )
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=2000
-            )
+            messages = [
+                {
+                    "role": "system",
+                    "content": contextual_prompt
+                },
+                {
+                    "role": "user",
+                    "content": (
+                        "Generate a concise, LLM-ready implementation ticket in Markdown without any placeholder fields or meta headers. "
+                        "Do NOT include sections like 'Example Code Snippet', 'Assigned To', 'Due Date', 'Tags', 'Ticket ID', 'Project', 'Component', 'Priority', 'Complexity', 'Status'. "
+                        "Focus on: Title, Summary, Intent, Scope, Files to Modify (list real paths if known or leave empty), Considerations, Acceptance Criteria as checklist. "
+                        f"User request: {user_request}"
+                    )
+                }
+            ]
+            response = await self._call_llm(messages)
             
             markdown_content = (response.choices[0].message.content or "").strip()
             markdown_content = self._sanitize_ticket(markdown_content)
@@ -169,7 +267,7 @@ class IntelligentTicketGenerator:
             return ticket
             
         except Exception as e:
-            print(f"Error generating ticket with LLM: {e}")
+            logger.error("Error generating ticket with LLM: %s", e)
             return {
                 "title": "Error generating ticket",
                 "description": f"Failed to generate ticket: {str(e)}",
@@ -177,50 +275,68 @@ class IntelligentTicketGenerator:
                 "files_to_modify": []
             }
     
+    async def _call_llm(self, messages: List[Dict[str, str]]) -> Any:
+        return await self.openai_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            temperature=0.3,
+            max_tokens=2000
+        )
+    
     def _parse_generated_ticket(self, markdown_content: str) -> Dict[str, Any]:
         """Parse the generated markdown ticket"""
-        lines = markdown_content.split('\n')
-        
-        # Extract title
-        title = "Generated Ticket"
-        for line in lines:
-            if line.startswith('# '):
-                title = line[2:].strip()
-                break
+        # Extract title: first line starting with '# ', found with C-level substring scans
+        if markdown_content.startswith('# '):
+            title_start = 2
+        else:
+            title_start = markdown_content.find('\n# ')
+            if title_start >= 0:
+                title_start += 3
+        if title_start >= 0:
+            title_end = markdown_content.find('\n', title_start)
+            if title_end < 0:
+                title_end = len(markdown_content)
+            title = markdown_content[title_start:title_end].strip()
+        else:
+            title = "Generated Ticket"
         
         # Extract description
         description = markdown_content
         
-        # Extract acceptance criteria
+        # Acceptance criteria and files to modify in one pass; StringIO
+        # yields lines lazily instead of materializing a split() list
         acceptance_criteria = []
-        in_criteria_section = False
-        for line in lines:
-            if line.strip() == "## Acceptance Criteria":
-                in_criteria_section = True
-                continue
-            elif line.startswith('## ') and in_criteria_section:
-                in_criteria_section = False
-                break
-            elif in_criteria_section and line.strip().startswith('- [ ]'):
-                criteria = line.strip()[5:].strip()
-                if criteria:
-                    acceptance_criteria.append(criteria)
-        
-        # Extract files to modify
         files_to_modify = []
-        in_files_section = False
-        for line in lines:
-            if line.strip() == "## Files to Modify":
-                in_files_section = True
-                continue
-            elif line.startswith('## ') and in_files_section:
-                in_files_section = False
+        in_criteria_section = criteria_done = False
+        in_files_section = files_done = False
+        for line in io.StringIO(markdown_content):
+            stripped = line.strip()
+            
+            if not criteria_done:
+                if stripped == "## Acceptance Criteria":
+                    in_criteria_section = True
+                elif line.startswith('## ') and in_criteria_section:
+                    in_criteria_section = False
+                    criteria_done = True
+                elif in_criteria_section and stripped.startswith('- [ ]'):
+                    # stripped has no trailing whitespace, so only the left side needs stripping
+                    criterion = stripped[5:].lstrip()
+                    if criterion:
+                        acceptance_criteria.append(criterion)
+            
+            if not files_done:
+                if stripped == "## Files to Modify":
+                    in_files_section = True
+                elif line.startswith('## ') and in_files_section:
+                    in_files_section = False
+                    files_done = True
+                elif in_files_section and '`' in line:
+                    match = _BACKTICK_RE.search(line)
+                    if match:
+                        files_to_modify.append(match.group(1))
+            
+            if criteria_done and files_done:
                 break
-            elif in_files_section and '`' in line:
-                import re
-                matches = re.findall(r'`([^`]+)`', line)
-                if matches:
-                    files_to_modify.append(matches[0])
         
         return {
             "title": title,
@@ -231,24 +347,13 @@ class IntelligentTicketGenerator:
         }
 
     def _sanitize_ticket(self, md: str) -> str:
-        disallowed_patterns = [
-            r"\*\*Assigned To:\*\*.*\n?",
-            r"\*\*Due Date:\*\*.*\n?",
-            r"\*\*Tags:\*\*.*\n?",
-            r"\*\*Ticket ID:\*\*.*\n?",
-            r"\*\*Project:\*\*.*\n?",
-            r"\*\*Component:\*\*.*\n?",
-            r"\*\*Priority:\*\*.*\n?",
-            r"\*\*Complexity:\*\*.*\n?",
-            r"\*\*Status:\*\*.*\n?",
-            r"(?si)##\s*Example Code Snippet.*?(?:\n##|\Z)",
-        ]
-        import re
-        cleaned = md
-        for pat in disallowed_patterns:
-            cleaned = re.sub(pat, "", cleaned)
-        cleaned = re.sub(r"```[\s\S]*?```", "", cleaned)
-        cleaned = re.sub(r"\n{3,}", "\n\n", cleaned).strip()
+        # Common case: the prompt already forbids these sections, so skip the regex work
+        if not any(tok in md for tok in _FAST_TOKENS) and "example code snippet" not in md.lower():
+            return md.strip()
+        cleaned = _META_HEADER_RE.sub("", md)
+        cleaned = _EXAMPLE_SNIPPET_RE.sub("", cleaned)
+        cleaned = _CODE_BLOCK_RE.sub("", cleaned)
+        cleaned = _BLANK_LINES_RE.sub("\n\n", cleaned).strip()
         return cleaned
     
     async def search_code_semantically(self, query: str, repo_url: str) -> List[Dict[str, Any]]:
@@ -5,14 +5,172 @@ RAG Service for intelligent code search and context retrieval
 
 import os
 import asyncio
-from typing import Dict, List, Optional, Any, Tuple
-import json
+import hashlib
+import heapq
+import logging
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Any, Tuple
 import re
 # from sentence_transformers import SentenceTransformer
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from ._distance import (
+    HNSW_MIN_VECTORS, build_flat_index, build_hnsw_index, count_term_matches, faiss,
+    normalize_rows, numba, term_fingerprint, text_fingerprint,
+)
+from utils import json_utils
 
-@dataclass
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r'\b\w+\b')
+_TERM_RE = re.compile(r"[a-z0-9_]+")
+_COMMON_WORDS = frozenset({"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "is", "are", "was", "were", "be", "been", "have", "has", "had", "do", "does", "did", "will", "would", "could", "should", "may", "might", "can", "this", "that", "these", "those"})
+
+# Function naming
+_FUNC_PATTERNS = (
+    re.compile(r'def\s+([a-z_][a-z0-9_]*)'),  # Python
+    re.compile(r'function\s+([a-z][a-zA-Z0-9]*)'),  # JavaScript
+    re.compile(r'const\s+([a-z][a-zA-Z0-9]*)\s*='),  # JavaScript/TypeScript
+)
+
+# Python imports
+_PY_IMPORT_RE = re.compile(r'import\s+([a-zA-Z_][a-zA-Z0-9_]*)')
+_PY_FROM_RE = re.compile(r'from\s+([a-zA-Z_][a-zA-Z0-9_]*)')
+# JavaScript/TypeScript imports
+_JS_REQUIRE_RE = re.compile(r'require\([\'"]([^\'"]+)[\'"]\)')
+_JS_IMPORT_RE = re.compile(r'import\s+.*?from\s+[\'"]([^\'"]+)[\'"]')
+
+# Keyword groups in priority order: the first group with any keyword in the
+# request wins. Each table is scanned in a single pass over the request.
+_INTENT_GROUPS = (
+    ("feature_implementation", ("add", "create", "implement", "build")),
+    ("bug_fix", ("fix", "bug", "error", "issue")),
+    ("refactoring", ("refactor", "improve", "optimize")),
+    ("security_update", ("security", "vulnerability", "auth")),
+    ("performance_optimization", ("performance", "speed", "efficiency")),
+)
+_SCOPE_GROUPS = (
+    ("component", ("component", "function", "class")),
+    ("module", ("module", "service", "api")),
+    ("system", ("system", "architecture", "database")),
+)
+
+def _keyword_scanner(groups):
+    """Build (regex, keyword -> label, label -> rank) for a priority-ordered keyword table"""
+    keyword_map = {keyword: label for label, keywords in groups for keyword in keywords}
+    rank = {label: i for i, (label, _) in enumerate(groups)}
+    # Lookahead so overlapping keywords are all reported, matching substring semantics
+    pattern = re.compile("(?=(" + "|".join(map(re.escape, keyword_map)) + "))")
+    return pattern, keyword_map, rank
+
+def _match_keyword_group(scanner, text: str, default: str) -> str:
+    pattern, keyword_map, rank = scanner
+    best = None
+    for m in pattern.finditer(text):
+        label = keyword_map[m.group(1)]
+        if best is None or rank[label] < rank[best]:
+            best = label
+            if rank[best] == 0:
+                break
+    return best or default
+
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first; O(N) partition then sort only k"""
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if len(scores) > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+_INTENT_SCANNER = _keyword_scanner(_INTENT_GROUPS)
+_SCOPE_SCANNER = _keyword_scanner(_SCOPE_GROUPS)
+
+_TECHNOLOGY_KEYWORDS = (
+    ("react", ("react", "jsx", "component", "hook")),
+    ("vue", ("vue", "template", "composition")),
+    ("angular", ("angular", "service", "directive")),
+    ("flutter", ("flutter", "widget", "dart")),
+    ("python", ("python", "django", "flask", "fastapi")),
+    ("java", ("java", "spring", "maven")),
+    ("typescript", ("typescript", "ts", "interface", "type")),
+    ("javascript", ("javascript", "js", "node", "express")),
+    ("database", ("database", "sql", "mongodb", "postgres")),
+    ("api", ("api", "rest", "graphql", "endpoint")),
+    ("auth", ("authentication", "auth", "login", "jwt", "oauth")),
+    ("testing", ("test", "spec", "unit", "integration", "e2e")),
+)
+
+# Framework/library signals, in reporting order, and the substrings that reveal them
+_TECH_SIGNALS = (
+    ("frameworks", "react"), ("frameworks", "vue"), ("frameworks", "angular"),
+    ("frameworks", "flutter"), ("frameworks", "django"), ("frameworks", "fastapi"),
+    ("frameworks", "spring"),
+    ("libraries", "axios"), ("libraries", "lodash"), ("libraries", "moment"),
+    ("libraries", "pandas"),
+)
+_TECH_TOKENS = {name: (category, name) for category, name in _TECH_SIGNALS}
+_TECH_TOKENS["jsx"] = ("frameworks", "react")
+
+if ahocorasick is not None:
+    _TECH_AUTOMATON = ahocorasick.Automaton()
+    for _token, _signal in _TECH_TOKENS.items():
+        _TECH_AUTOMATON.add_word(_token, _signal)
+    _TECH_AUTOMATON.make_automaton()
+
+    def _find_tech_signals(code_lower: str) -> set:
+        return {signal for _, signal in _TECH_AUTOMATON.iter(code_lower)}
+else:
+    # Lookahead alternation reports overlapping hits in one left-to-right pass
+    _TECH_TOKEN_RE = re.compile("(?=(" + "|".join(map(re.escape, _TECH_TOKENS)) + "))")
+
+    def _find_tech_signals(code_lower: str) -> set:
+        return {_TECH_TOKENS[m.group(1)] for m in _TECH_TOKEN_RE.finditer(code_lower)}
+
+# Query embeddings keyed by a content hash of (model, text). Values are tasks so
+# concurrent requests for the same text share a single encode call.
+_QUERY_EMBEDDING_CACHE_SIZE = 4096
+_query_embedding_cache: "OrderedDict[bytes, asyncio.Task]" = OrderedDict()
+
+# Search state for recently searched corpora, keyed by id() of the embeddings
+# list; the list itself is kept on the entry so a recycled id can't alias it
+_CORPUS_CACHE_SIZE = 8
+_corpus_cache: "OrderedDict[int, _CorpusIndex]" = OrderedDict()
+# Stacked n-gram fingerprints and text lengths for the keyword fallback scorer, same keying
+_fingerprint_cache: "OrderedDict[int, Tuple[List[Dict[str, Any]], int, np.ndarray, np.ndarray]]" = OrderedDict()
+
+# Framework and best-practice signals sit near the top of a file, so those scans
+# only look at this many leading characters of each chunk
+_SCAN_PREFIX_CHARS = 4096
+
+# Filename markers for _detect_architectural_patterns, one bit each
+_ARCH_MODEL = 1 << 0
+_ARCH_VIEW = 1 << 1
+_ARCH_CONTROLLER = 1 << 2
+_ARCH_COMPONENT = 1 << 3
+_ARCH_SERVICE = 1 << 4
+_ARCH_REPOSITORY = 1 << 5
+_ARCH_DOMAIN = 1 << 6
+_ARCH_APPLICATION = 1 << 7
+_ARCH_MVC = _ARCH_MODEL | _ARCH_VIEW | _ARCH_CONTROLLER
+_ARCH_CLEAN = _ARCH_DOMAIN | _ARCH_APPLICATION
+
+# Best-practice markers; the lookahead reports overlapping markers (e.g. "exceptest")
+# and the ASCII-only ignorecase on the test markers equals checking the lowercased code
+_PRACTICE_RE = re.compile(
+    r"(?=(?P<errors>try:|catch|except)|(?P<docs>\"{3}|'{3}|//)|(?P<tests>(?i:test|spec)))",
+    re.ASCII,
+)
+_PRACTICE_LABELS = {"errors": "Error Handling", "docs": "Code Documentation", "tests": "Testing"}
+
+@dataclass(slots=True, frozen=True)
 class CodeChunk:
     filename: str
     code: str
@@ -20,6 +178,20 @@ class CodeChunk:
     score: float
     metadata: Dict[str, Any]
     location: str
+    # Lowercased code, computed once and shared by every scan over the chunk
+    code_lower: str = field(default="", repr=False, compare=False)
+
+    def __post_init__(self):
+        if not self.code_lower:
+            object.__setattr__(self, "code_lower", self.code.lower())
+
+@dataclass
+class _CorpusIndex:
+    corpus: List[Dict[str, Any]]
+    size: int
+    embedded: List[Dict[str, Any]]
+    matrix: np.ndarray  # (N, dim) float32, rows L2-normalized
+    faiss_index: Any = None
 
 @dataclass
 class ProjectContext:
@@ -30,41 +202,45 @@ class ProjectContext:
     best_practices: List[str]
     dependencies: Dict[str, List[str]]
 
+def prepare_code_embeddings(code_embeddings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Cache lowercased text on each chunk at ingest so searches don't re-lowercase it"""
+    for chunk in code_embeddings:
+        code = chunk.get("code", "")
+        chunk["_code_lower"] = code.lower()
+        chunk["_search_blob"] = f"{chunk.get('filename', '')}\n{code}".lower()
+        if numba is not None:
+            chunk["_search_bits"] = text_fingerprint(chunk["_search_blob"])
+    return code_embeddings
+
 class RAGService:
     def __init__(self, embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"):
         # self.embedding_model = SentenceTransformer(embedding_model)
         self.embedding_model = None
+        self.embedding_model_name = embedding_model
         self.embedding_dimension = 384  # Dimension of all-MiniLM-L6-v2
         
     async def analyze_user_request(self, user_request: str) -> Dict[str, Any]:
         """Analyze user request to understand intent and requirements"""
+        # The helpers are memoized on the request string, so return fresh lists
+        # rather than handing callers the cached objects
         analysis = {
             "intent": self._classify_intent(user_request),
             "complexity": self._estimate_complexity(user_request),
             "scope": self._determine_scope(user_request),
-            "keywords": self._extract_keywords(user_request),
-            "technology_hints": self._extract_technology_hints(user_request)
+            "keywords": list(self._extract_keywords(user_request)),
+            "technology_hints": list(self._extract_technology_hints(user_request))
         }
         return analysis
     
-    def _classify_intent(self, request: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _classify_intent(request: str) -> str:
         """Classify the intent of the user request"""
-        request_lower = request.lower()
-        
-        if any(word in request_lower for word in ["add", "create", "implement", "build"]):
-            return "feature_implementation"
-        elif any(word in request_lower for word in ["fix", "bug", "error", "issue"]):
-            return "bug_fix"
-        elif any(word in request_lower for word in ["refactor", "improve", "optimize"]):
-            return "refactoring"
-        elif any(word in request_lower for word in ["security", "vulnerability", "auth"]):
-            return "security_update"
-        elif any(word in request_lower for word in ["performance", "speed", "efficiency"]):
-            return "performance_optimization"
-        else:
-            return "general_implementation"
+        return _match_keyword_group(_INTENT_SCANNER, request.lower(), "general_implementation")
     
-    def _estimate_complexity(self, request: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _estimate_complexity(request: str) -> str:
         """Estimate the complexity of the request"""
         words = request.split()
         if len(words) < 10:
@@ -74,130 +250,193 @@ class RAGService:
         else:
             return "complex"
     
-    def _determine_scope(self, request: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _determine_scope(request: str) -> str:
         """Determine the scope of the request"""
-        request_lower = request.lower()
-        
-        if any(word in request_lower for word in ["component", "function", "class"]):
-            return "component"
-        elif any(word in request_lower for word in ["module", "service", "api"]):
-            return "module"
-        elif any(word in request_lower for word in ["system", "architecture", "database"]):
-            return "system"
-        else:
-            return "component"
+        return _match_keyword_group(_SCOPE_SCANNER, request.lower(), "component")
     
-    def _extract_keywords(self, request: str) -> List[str]:
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _extract_keywords(request: str) -> FrozenSet[str]:
         """Extract important keywords from the request"""
         # Remove common words and extract meaningful keywords
-        common_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "is", "are", "was", "were", "be", "been", "have", "has", "had", "do", "does", "did", "will", "would", "could", "should", "may", "might", "can", "this", "that", "these", "those"}
-        
-        words = re.findall(r'\b\w+\b', request.lower())
-        keywords = [word for word in words if word not in common_words and len(word) > 2]
-        
-        return list(set(keywords))
+        words = _WORD_RE.findall(request.lower())
+        return frozenset(word for word in words if word not in _COMMON_WORDS and len(word) > 2)
     
-    def _extract_technology_hints(self, request: str) -> List[str]:
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _extract_technology_hints(request: str) -> Tuple[str, ...]:
         """Extract technology hints from the request"""
-        technology_keywords = {
-            "react": ["react", "jsx", "component", "hook"],
-            "vue": ["vue", "template", "composition"],
-            "angular": ["angular", "service", "directive"],
-            "flutter": ["flutter", "widget", "dart"],
-            "python": ["python", "django", "flask", "fastapi"],
-            "java": ["java", "spring", "maven"],
-            "typescript": ["typescript", "ts", "interface", "type"],
-            "javascript": ["javascript", "js", "node", "express"],
-            "database": ["database", "sql", "mongodb", "postgres"],
-            "api": ["api", "rest", "graphql", "endpoint"],
-            "auth": ["authentication", "auth", "login", "jwt", "oauth"],
-            "testing": ["test", "spec", "unit", "integration", "e2e"]
-        }
-        
-        hints = []
         request_lower = request.lower()
+        return tuple(
+            tech for tech, keywords in _TECHNOLOGY_KEYWORDS
+            if any(keyword in request_lower for keyword in keywords)
+        )
+    
+    async def _embed_query(self, query: str) -> np.ndarray:
+        """Embed a query, reusing cached or in-flight results for identical text"""
+        key = hashlib.blake2b(f"{self.embedding_model_name}\0{query}".encode(), digest_size=16).digest()
+        task = _query_embedding_cache.get(key)
+        if task is None:
+            task = asyncio.create_task(asyncio.to_thread(self.embedding_model.encode, [query]))
+            _query_embedding_cache[key] = task
+            if len(_query_embedding_cache) > _QUERY_EMBEDDING_CACHE_SIZE:
+                _query_embedding_cache.popitem(last=False)
+        else:
+            _query_embedding_cache.move_to_end(key)
         
-        for tech, keywords in technology_keywords.items():
-            if any(keyword in request_lower for keyword in keywords):
-                hints.append(tech)
-        
-        return hints
+        try:
+            embeddings = await asyncio.shield(task)
+        except Exception:
+            # Don't keep failed encodes around; the next caller retries
+            if _query_embedding_cache.get(key) is task:
+                del _query_embedding_cache[key]
+            raise
+        return embeddings[0]
     
     async def search_relevant_code(self, query: str, code_embeddings: List[Dict[str, Any]], top_k: int = 15) -> List[CodeChunk]:
         """Search for relevant code using semantic similarity"""
-        try:
-            similarities = []
-            if self.embedding_model is not None:
-                query_embedding = self.embedding_model.encode([query])[0]
-                for chunk in code_embeddings:
-                    if "embedding" in chunk:
-                        chunk_embedding = np.array(chunk["embedding"])
-                        similarity = self._cosine_similarity(query_embedding, chunk_embedding)
-                        similarities.append((similarity, chunk))
+        similarities = []
+        if self.embedding_model is not None:
+            query_embedding = await self._embed_query(query)
+            corpus = self._get_corpus_index(code_embeddings)
+            embedded = corpus.embedded
+            if embedded:
+                q = np.ascontiguousarray(query_embedding, dtype=np.float32)
+                q_norm = np.linalg.norm(q)
+                if q_norm != 0:
+                    q = q / q_norm
+                if faiss is not None:
+                    # Exact flat scan for small corpora, HNSW graph once a scan gets expensive
+                    if corpus.faiss_index is None:
+                        build = build_hnsw_index if len(embedded) >= HNSW_MIN_VECTORS else build_flat_index
+                        corpus.faiss_index = build(corpus.matrix)
+                    scores, ids = corpus.faiss_index.search(q[None, :], top_k)
+                    similarities.extend((float(score), embedded[i]) for score, i in zip(scores[0], ids[0]) if i >= 0)
+                else:
+                    # Rows are unit length, so one BLAS matrix-vector product gives every cosine
+                    scores = corpus.matrix @ q
+                    similarities.extend((float(scores[i]), embedded[i]) for i in _top_k_indices(scores, top_k))
+        else:
+            q = query.lower()
+            q_terms = set(_TERM_RE.findall(q))
+            fingerprints = self._get_fingerprints(code_embeddings) if numba is not None else None
+            if fingerprints is not None and q_terms:
+                # JIT prefilter: a chunk can only contain a term if all of the term's n-grams
+                # are in its fingerprint. Collisions can over-report, so candidates are
+                # confirmed with the exact substring check before scoring
+                chunk_bits, lengths = fingerprints
+                term_bits = np.stack([term_fingerprint(t) for t in q_terms])
+                matches = np.zeros(len(code_embeddings))
+                for i in np.flatnonzero(count_term_matches(term_bits, chunk_bits)):
+                    text = code_embeddings[i]["_search_blob"]
+                    matches[i] = sum(1 for t in q_terms if t in text)
+                scores = (matches / len(q_terms)) * 0.7 + 0.3 * np.minimum(lengths / 10000.0, 1.0)
+                similarities.extend(zip(scores.tolist(), code_embeddings))
             else:
-                q = query.lower()
-                q_terms = set(re.findall(r"[a-z0-9_]+", q))
                 for chunk in code_embeddings:
-                    text = f"{chunk.get('filename','')}\n{chunk.get('code','')}".lower()
+                    text = chunk.get("_search_blob") or f"{chunk.get('filename','')}\n{chunk.get('code','')}".lower()
                     matches = sum(1 for t in q_terms if t and t in text)
                     length_penalty = min(len(text) / 10000.0, 1.0)
                     score = (matches / (len(q_terms) or 1)) * 0.7 + 0.3 * length_penalty
                     similarities.append((score, chunk))
-            
-            # Sort by similarity and get top results
-            similarities.sort(key=lambda x: x[0], reverse=True)
-            top_results = similarities[:top_k]
-            
-            # Convert to CodeChunk objects
-            code_chunks = []
-            for score, chunk in top_results:
-                if score > 0.3:  # Minimum similarity threshold
-                    code_chunks.append(CodeChunk(
-                        filename=chunk.get("filename", ""),
-                        code=chunk.get("code", ""),
-                        language=chunk.get("language", ""),
-                        score=float(score),
-                        metadata=chunk.get("metadata", {}),
-                        location=chunk.get("location", "")
-                    ))
-            
-            return code_chunks
-            
-        except Exception as e:
-            print(f"Error in search_relevant_code: {e}")
-            return []
-    
-    def _cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
-        """Calculate cosine similarity between two vectors"""
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
         
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-        
-        return dot_product / (norm1 * norm2)
+        # Get top results without sorting the whole candidate list
+        top_results = heapq.nlargest(top_k, similarities, key=lambda x: x[0])
+        
+        # Convert to CodeChunk objects
+        code_chunks = []
+        for score, chunk in top_results:
+            if score > 0.3:  # Minimum similarity threshold
+                code_chunks.append(CodeChunk(
+                    filename=chunk.get("filename", ""),
+                    code=chunk.get("code", ""),
+                    language=chunk.get("language", ""),
+                    score=float(score),
+                    metadata=chunk.get("metadata", {}),
+                    location=chunk.get("location", ""),
+                    code_lower=chunk.get("_code_lower", "")
+                ))
+        
+        return code_chunks
+    
+    def _get_fingerprints(self, code_embeddings: List[Dict[str, Any]]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Stacked fingerprints and text lengths for this corpus, or None if chunks weren't prepared"""
+        key = id(code_embeddings)
+        cached = _fingerprint_cache.get(key)
+        if cached is not None and cached[0] is code_embeddings and cached[1] == len(code_embeddings):
+            _fingerprint_cache.move_to_end(key)
+            return cached[2], cached[3]
+        
+        if not code_embeddings or not all("_search_bits" in chunk for chunk in code_embeddings):
+            return None
+        chunk_bits = np.stack([chunk["_search_bits"] for chunk in code_embeddings])
+        lengths = np.array([len(chunk["_search_blob"]) for chunk in code_embeddings], dtype=np.float64)
+        _fingerprint_cache[key] = (code_embeddings, len(code_embeddings), chunk_bits, lengths)
+        if len(_fingerprint_cache) > _CORPUS_CACHE_SIZE:
+            _fingerprint_cache.popitem(last=False)
+        return chunk_bits, lengths
+    
+    def _get_corpus_index(self, code_embeddings: List[Dict[str, Any]]) -> _CorpusIndex:
+        """Return the cached normalized embedding matrix for this corpus, building it on first use"""
+        key = id(code_embeddings)
+        cached = _corpus_cache.get(key)
+        if cached is not None and cached.corpus is code_embeddings and cached.size == len(code_embeddings):
+            _corpus_cache.move_to_end(key)
+            return cached
+        
+        embedded = []
+        vectors = []
+        for chunk in code_embeddings:
+            if "embedding" not in chunk:
+                continue
+            try:
+                vector = np.asarray(chunk["embedding"], dtype=np.float32)
+            except (TypeError, ValueError):
+                logger.exception("Skipping chunk with malformed embedding: %s", chunk.get("filename", ""))
+                continue
+            if vector.shape != (self.embedding_dimension,):
+                logger.warning("Skipping chunk with embedding shape %s: %s", vector.shape, chunk.get("filename", ""))
+                continue
+            embedded.append(chunk)
+            vectors.append(vector)
+        
+        if embedded:
+            matrix = np.stack(vectors)
+            # Chunks normalized at ingest are already unit length
+            if not all(chunk.get("_normalized") for chunk in embedded):
+                normalize_rows(matrix)
+        else:
+            matrix = np.empty((0, self.embedding_dimension), dtype=np.float32)
+        corpus = _CorpusIndex(
+            corpus=code_embeddings, size=len(code_embeddings), embedded=embedded, matrix=matrix
+        )
+        _corpus_cache[key] = corpus
+        if len(_corpus_cache) > _CORPUS_CACHE_SIZE:
+            _corpus_cache.popitem(last=False)
+        return corpus
     
     async def build_project_context(self, code_chunks: List[CodeChunk], project_metadata: Dict[str, Any]) -> ProjectContext:
         """Build comprehensive project context from code chunks and metadata"""
         
-        # Analyze technology stack
-        technology_stack = self._analyze_technology_stack(code_chunks, project_metadata)
-        
-        # Detect architectural patterns
-        architectural_patterns = self._detect_architectural_patterns(code_chunks)
-        
-        # Analyze coding conventions
-        coding_conventions = self._analyze_coding_conventions(code_chunks)
-        
-        # Extract similar implementations
-        similar_implementations = self._extract_similar_implementations(code_chunks)
-        
-        # Identify best practices
-        best_practices = self._identify_best_practices(code_chunks)
-        
-        # Analyze dependencies
-        dependencies = self._analyze_dependencies(code_chunks, project_metadata)
+        # The analyses only read the chunks, so run them side by side on the
+        # default thread pool instead of blocking the event loop for all six
+        (
+            technology_stack,
+            architectural_patterns,
+            coding_conventions,
+            similar_implementations,
+            best_practices,
+            dependencies,
+        ) = await asyncio.gather(
+            asyncio.to_thread(self._analyze_technology_stack, code_chunks, project_metadata),
+            asyncio.to_thread(self._detect_architectural_patterns, code_chunks),
+            asyncio.to_thread(self._analyze_coding_conventions, code_chunks),
+            asyncio.to_thread(self._extract_similar_implementations, code_chunks),
+            asyncio.to_thread(self._identify_best_practices, code_chunks),
+            asyncio.to_thread(self._analyze_dependencies, code_chunks, project_metadata),
+        )
         
         return ProjectContext(
             technology_stack=technology_stack,
@@ -211,78 +450,72 @@ class RAGService:
     def _analyze_technology_stack(self, code_chunks: List[CodeChunk], project_metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze the technology stack from code chunks"""
         stack = {
-            "languages": {},
-            "frameworks": {},
-            "libraries": {},
-            "tools": {},
-            "databases": {},
-            "platforms": {}
+            "languages": Counter(),
+            "frameworks": Counter(),
+            "libraries": Counter(),
+            "tools": Counter(),
+            "databases": Counter(),
+            "platforms": Counter()
         }
         
         # Count languages
-        for chunk in code_chunks:
-            lang = chunk.language
-            if lang not in stack["languages"]:
-                stack["languages"][lang] = 0
-            stack["languages"][lang] += 1
+        stack["languages"].update(chunk.language for chunk in code_chunks)
         
-        # Analyze code content for frameworks and libraries
+        # Analyze code content for frameworks and libraries: one automaton pass
+        # per chunk finds every signal token, then each hit counts once per chunk
         for chunk in code_chunks:
-            code_lower = chunk.code.lower()
-            
-            # Detect frameworks
-            if "react" in code_lower or "jsx" in code_lower:
-                stack["frameworks"]["react"] = stack["frameworks"].get("react", 0) + 1
-            if "vue" in code_lower:
-                stack["frameworks"]["vue"] = stack["frameworks"].get("vue", 0) + 1
-            if "angular" in code_lower:
-                stack["frameworks"]["angular"] = stack["frameworks"].get("angular", 0) + 1
-            if "flutter" in code_lower:
-                stack["frameworks"]["flutter"] = stack["frameworks"].get("flutter", 0) + 1
-            if "django" in code_lower:
-                stack["frameworks"]["django"] = stack["frameworks"].get("django", 0) + 1
-            if "fastapi" in code_lower:
-                stack["frameworks"]["fastapi"] = stack["frameworks"].get("fastapi", 0) + 1
-            if "spring" in code_lower:
-                stack["frameworks"]["spring"] = stack["frameworks"].get("spring", 0) + 1
-            
-            # Detect libraries
-            if "axios" in code_lower:
-                stack["libraries"]["axios"] = stack["libraries"].get("axios", 0) + 1
-            if "lodash" in code_lower:
-                stack["libraries"]["lodash"] = stack["libraries"].get("lodash", 0) + 1
-            if "moment" in code_lower:
-                stack["libraries"]["moment"] = stack["libraries"].get("moment", 0) + 1
-            if "pandas" in code_lower:
-                stack["libraries"]["pandas"] = stack["libraries"].get("pandas", 0) + 1
-        
-        return stack
+            hits = _find_tech_signals(chunk.code_lower[:_SCAN_PREFIX_CHARS])
+            if not hits:
+                continue
+            for category, name in _TECH_SIGNALS:
+                if (category, name) in hits:
+                    stack[category][name] += 1
+        
+        return {category: dict(counts) for category, counts in stack.items()}
     
     def _detect_architectural_patterns(self, code_chunks: List[CodeChunk]) -> List[str]:
         """Detect architectural patterns from code"""
         patterns = []
         
-        # Analyze file structure and naming
-        filenames = [chunk.filename for chunk in code_chunks]
+        # Analyze file structure and naming in one pass, OR-ing in a bit per marker
+        flags = 0
+        for chunk in code_chunks:
+            f = chunk.filename.lower()
+            if "model" in f:
+                flags |= _ARCH_MODEL
+            if "view" in f:
+                flags |= _ARCH_VIEW
+            if "controller" in f:
+                flags |= _ARCH_CONTROLLER
+            if "component" in f:
+                flags |= _ARCH_COMPONENT
+            if "service" in f:
+                flags |= _ARCH_SERVICE
+            if "repository" in f:
+                flags |= _ARCH_REPOSITORY
+            if "domain" in f:
+                flags |= _ARCH_DOMAIN
+            if "application" in f:
+                flags |= _ARCH_APPLICATION
         
         # MVC Pattern
-        if any("model" in f.lower() for f in filenames) and any("view" in f.lower() for f in filenames) and any("controller" in f.lower() for f in filenames):
+        if flags & _ARCH_MVC == _ARCH_MVC:
             patterns.append("MVC")
         
-        # Component-based architecture
-        if any("component" in f.lower() for f in filenames) or any("components" in f.lower() for f in filenames):
+        # Component-based architecture ("components" contains "component")
+        if flags & _ARCH_COMPONENT:
             patterns.append("Component-based")
         
         # Service layer pattern
-        if any("service" in f.lower() for f in filenames):
+        if flags & _ARCH_SERVICE:
             patterns.append("Service Layer")
         
         # Repository pattern
-        if any("repository" in f.lower() for f in filenames):
+        if flags & _ARCH_REPOSITORY:
             patterns.append("Repository Pattern")
         
         # Clean Architecture
-        if any("domain" in f.lower() for f in filenames) and any("application" in f.lower() for f in filenames):
+        if flags & _ARCH_CLEAN == _ARCH_CLEAN:
             patterns.append("Clean Architecture")
         
         return patterns
@@ -299,15 +532,8 @@ class RAGService:
         for chunk in code_chunks:
             code = chunk.code
             
-            # Function naming
-            function_patterns = [
-                r'def\s+([a-z_][a-z0-9_]*)',  # Python
-                r'function\s+([a-z][a-zA-Z0-9]*)',  # JavaScript
-                r'const\s+([a-z][a-zA-Z0-9]*)\s*=',  # JavaScript/TypeScript
-            ]
-            
-            for pattern in function_patterns:
-                matches = re.findall(pattern, code)
+            for pattern in _FUNC_PATTERNS:
+                matches = pattern.findall(code)
                 for match in matches:
                     if match[0].isupper():
                         conventions["naming"]["PascalCase"] = conventions["naming"].get("PascalCase", 0) + 1
@@ -344,23 +570,19 @@ class RAGService:
         practices = []
         
         for chunk in code_chunks:
-            code = chunk.code
+            code = chunk.code[:_SCAN_PREFIX_CHARS]
             
-            # Error handling
-            if "try:" in code or "catch" in code or "except" in code:
-                practices.append("Error Handling")
+            # Error handling, documentation and testing in one scan
+            found = set()
+            for m in _PRACTICE_RE.finditer(code):
+                found.add(m.lastgroup)
+                if len(found) == len(_PRACTICE_LABELS):
+                    break
+            practices.extend(_PRACTICE_LABELS[group] for group in found)
             
             # Type annotations
             if ":" in code and ("def " in code or "function" in code):
                 practices.append("Type Annotations")
-            
-            # Documentation
-            if '"""' in code or "'''" in code or "//" in code:
-                practices.append("Code Documentation")
-            
-            # Testing
-            if "test" in code.lower() or "spec" in code.lower():
-                practices.append("Testing")
         
         return list(set(practices))
     
@@ -375,29 +597,26 @@ class RAGService:
         # Extract from project metadata if available
         if "package.json" in project_metadata:
             try:
-                package_data = json.loads(project_metadata["package.json"])
+                package_data = json_utils.loads(project_metadata["package.json"])
                 dependencies["runtime"] = list(package_data.get("dependencies", {}).keys())
                 dependencies["development"] = list(package_data.get("devDependencies", {}).keys())
             except:
                 pass
         
         # Extract from code imports
+        external = set()
         for chunk in code_chunks:
             code = chunk.code
             
             # Python imports
-            import_matches = re.findall(r'import\s+([a-zA-Z_][a-zA-Z0-9_]*)', code)
-            from_matches = re.findall(r'from\s+([a-zA-Z_][a-zA-Z0-9_]*)', code)
+            external.update(_PY_IMPORT_RE.findall(code))
+            external.update(_PY_FROM_RE.findall(code))
             
             # JavaScript/TypeScript imports
-            require_matches = re.findall(r'require\([\'"]([^\'"]+)[\'"]\)', code)
-            import_js_matches = re.findall(r'import\s+.*?from\s+[\'"]([^\'"]+)[\'"]', code)
-            
-            all_imports = import_matches + from_matches + require_matches + import_js_matches
-            
-            for imp in all_imports:
-                if imp not in dependencies["external"]:
-                    dependencies["external"].append(imp)
+            external.update(_JS_REQUIRE_RE.findall(code))
+            external.update(_JS_IMPORT_RE.findall(code))
+        
+        dependencies["external"] = sorted(external)
         
         return dependencies
     
@@ -452,52 +671,53 @@ Generate a comprehensive implementation ticket that is perfectly aligned with th
     
     def _build_technology_context(self, technology_stack: Dict[str, Any]) -> str:
         """Build technology-specific context"""
-        context = "TECHNOLOGY STACK:\n"
+        parts = ["TECHNOLOGY STACK:\n"]
         
         if technology_stack["languages"]:
             main_languages = sorted(technology_stack["languages"].items(), key=lambda x: x[1], reverse=True)[:3]
-            context += f"- Primary Languages: {', '.join([lang for lang, _ in main_languages])}\n"
+            parts.append(f"- Primary Languages: {', '.join([lang for lang, _ in main_languages])}\n")
         
         if technology_stack["frameworks"]:
             main_frameworks = sorted(technology_stack["frameworks"].items(), key=lambda x: x[1], reverse=True)[:3]
-            context += f"- Frameworks: {', '.join([fw for fw, _ in main_frameworks])}\n"
+            parts.append(f"- Frameworks: {', '.join([fw for fw, _ in main_frameworks])}\n")
         
         if technology_stack["libraries"]:
             main_libraries = sorted(technology_stack["libraries"].items(), key=lambda x: x[1], reverse=True)[:5]
-            context += f"- Key Libraries: {', '.join([lib for lib, _ in main_libraries])}\n"
+            parts.append(f"- Key Libraries: {', '.join([lib for lib, _ in main_libraries])}\n")
         
-        return context
+        return "".join(parts)
     
     def _build_architectural_context(self, architectural_patterns: List[str]) -> str:
         """Build architectural context"""
         if not architectural_patterns:
             return "ARCHITECTURE: Standard application architecture\n"
         
-        context = "ARCHITECTURAL PATTERNS:\n"
-        for pattern in architectural_patterns:
-            context += f"- {pattern}\n"
+        parts = ["ARCHITECTURAL PATTERNS:\n"]
+        parts.extend(f"- {pattern}\n" for pattern in architectural_patterns)
         
-        return context
+        return "".join(parts)
     
     def _build_conventions_context(self, coding_conventions: Dict[str, Any]) -> str:
         """Build coding conventions context"""
-        context = "CODING CONVENTIONS:\n"
+        parts = ["CODING CONVENTIONS:\n"]
         
         if coding_conventions["naming"]:
             naming_style = max(coding_conventions["naming"].items(), key=lambda x: x[1])[0]
-            context += f"- Naming Convention: {naming_style}\n"
+            parts.append(f"- Naming Convention: {naming_style}\n")
         
-        return context
+        return "".join(parts)
     
     def _build_examples_context(self, similar_implementations: List[CodeChunk]) -> str:
         """Build examples context from similar implementations"""
         if not similar_implementations:
             return "EXAMPLES: No specific examples available\n"
         
-        context = "SIMILAR IMPLEMENTATIONS (for reference):\n"
+        parts = ["SIMILAR IMPLEMENTATIONS (for reference):\n"]
         for i, impl in enumerate(similar_implementations[:3], 1):
-            context += f"{i}. File: {impl.filename}\n"
-            context += f"   Language: {impl.language}\n"
-            context += f"   Code: {impl.code[:200]}...\n\n"
+            parts.append(
+                f"{i}. File: {impl.filename}\n"
+                f"   Language: {impl.language}\n"
+                f"   Code: {impl.code[:200]}...\n\n"
+            )
         
-        return context
+        return "".join(parts)
@@ -1,44 +1,378 @@
 import re
 import os
+import io
+import zipfile
+import time
+import random
+import asyncio
+import hashlib
 import httpx
+from collections import OrderedDict
+from datetime import datetime, timezone
 from typing import Optional
+from utils.supabase_client import get_supabase
+from utils import json_utils
 # from .embedding_service import embedding_service
 
+# Concurrent GitHub contents requests per analysis; keeps bursts under the abuse limits
+GITHUB_FETCH_CONCURRENCY = 8
+
+# Retries for rate-limited (429, or 403 with the quota exhausted) and 5xx responses
+GITHUB_MAX_RETRIES = 5
+GITHUB_MAX_BACKOFF_SECONDS = 60
+# A rate limit that resets later than this fails the request instead of waiting it out
+GITHUB_MAX_RATE_LIMIT_WAIT_SECONDS = 10
+
+# Authenticated calls are self-throttled to GitHub's 5000/hour quota, allowing short bursts
+GITHUB_RATE_PER_SECOND = 5000 / 3600
+GITHUB_RATE_BURST = 100
+# Tokens whose buckets are kept; the least recently used is dropped past this
+GITHUB_RATE_BUCKETS_MAX = 256
+
+# Order in which detected technologies are reported
+STACK_ORDER = (
+    'nextjs', 'tailwindcss', 'react', 'vue', 'fastapi/python', 'nodejs',
+    'python', 'rust', 'dotnet', 'supabase', 'docker'
+)
+
+# Relevant files containing any of these are fetched before the other source files
+CONFIG_MARKERS = ('package.json', 'tsconfig.json', 'next.config', 'tailwind.config')
+
+# Characters of each key file kept for the analysis
+KEY_FILE_MAX_CHARS = 1500
+
+# Top-level directories expanded when GitHub truncates the recursive tree
+TRUNCATED_TREE_DIRS = frozenset(('src', 'backend', 'frontend', 'app', 'components'))
+
+# The archive replaces ~15 small key-file requests, which only pays off for small repos;
+# anything larger (by the repo's reported size or the archive's length) uses /contents
+ZIPBALL_MAX_BYTES = 2 * 1024 * 1024
+
+# Analysis result cache keyed by tree SHA: "enabled" reads and writes it,
+# "replay" only reads it, "disabled" bypasses it
+CACHE_POLICIES = ("enabled", "replay", "disabled")
+
+_GH_RE = re.compile(r"github.com/([^/]+)/([^/#?]+)")
+# Source files under the usual top-level app directories
+_SRC_RE = re.compile(r"(?:src|backend|frontend|app|components)/.*\.(?:tsx|ts|jsx|js|py|java|cs|rb)\Z", re.DOTALL)
+
+class GitHubError(Exception):
+    def __init__(self, status_code: int, url: str):
+        super().__init__(f"GitHub API error {status_code} for {url}")
+        self.status_code = status_code
+        self.url = url
+
+class GhRateLimited(GitHubError):
+    pass
+
+class GhNotFound(GitHubError):
+    pass
+
+class GhServerError(GitHubError):
+    pass
+
+class _TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        async with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 1
+                self.updated = time.monotonic()
+            self.tokens -= 1
+
+# One bucket per token, since the quota is per token; keyed by a digest so tokens aren't kept in memory
+_rate_buckets: "OrderedDict[bytes, _TokenBucket]" = OrderedDict()
+
+def _rate_bucket(auth: str) -> _TokenBucket:
+    key = hashlib.sha256(auth.encode()).digest()
+    bucket = _rate_buckets.get(key)
+    if bucket is None:
+        bucket = _rate_buckets[key] = _TokenBucket(GITHUB_RATE_PER_SECOND, GITHUB_RATE_BURST)
+        if len(_rate_buckets) > GITHUB_RATE_BUCKETS_MAX:
+            _rate_buckets.popitem(last=False)
+    else:
+        _rate_buckets.move_to_end(key)
+    return bucket
+
+def _retry_delay(res: httpx.Response, attempt: int) -> float:
+    retry_after = res.headers.get('Retry-After', '')
+    reset = res.headers.get('X-RateLimit-Reset', '')
+    if retry_after.isdigit():
+        delay = float(retry_after)
+    elif res.headers.get('X-RateLimit-Remaining') == '0' and reset.isdigit():
+        delay = float(reset) - time.time()
+    else:
+        delay = 2 ** attempt + random.random()
+    return max(delay, 0.0)
+
+async def _get(client: httpx.AsyncClient, url: str, headers: Optional[dict] = None, stream: bool = False, follow_redirects: bool = False) -> httpx.Response:
+    """GET that backs off and retries on rate limits and 5xx; raises GhNotFound on 404 and GhRateLimited/GhServerError once retries run out"""
+    auth = client.headers.get('Authorization')
+    for attempt in range(GITHUB_MAX_RETRIES + 1):
+        if auth:
+            await _rate_bucket(auth).acquire()
+        request = client.build_request("GET", url, headers=headers)
+        res = await client.send(request, stream=stream, follow_redirects=follow_redirects)
+        status = res.status_code
+        if status == 404:
+            await res.aclose()
+            raise GhNotFound(status, url)
+        rate_limited = status == 429 or (
+            status == 403 and (res.headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in res.headers)
+        )
+        if not rate_limited and status < 500:
+            return res
+        await res.aclose()
+        if attempt == GITHUB_MAX_RETRIES:
+            raise (GhRateLimited if rate_limited else GhServerError)(status, url)
+        delay = _retry_delay(res, attempt)
+        if rate_limited and delay > GITHUB_MAX_RATE_LIMIT_WAIT_SECONDS:
+            # The quota resets minutes away; retrying within this request can't succeed
+            raise GhRateLimited(status, url)
+        delay = min(delay, GITHUB_MAX_BACKOFF_SECONDS)
+        print(f"GitHub returned {status} for {url}, retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
 def _parse_github_repo(repo_url: str) -> tuple[str, str]:
-    m = re.search(r"github.com/([^/]+)/([^/#?]+)", repo_url)
+    m = _GH_RE.search(repo_url)
     if not m:
         return ("", "")
     owner, repo = m.group(1), m.group(2).replace('.git', '')
     return owner, repo
 
-async def analyze_repository(repo_url: str, github_token: Optional[str] = None) -> dict:
+def _load_etag(url: str) -> Optional[dict]:
+    supabase = get_supabase()
+    try:
+        res = supabase.table("github_etag_cache").select("etag, body").eq("url", url).limit(1).execute()
+    except Exception as e:
+        print(f"ETag cache lookup failed for {url}: {e}")
+        return None
+    return res.data[0] if res.data else None
+
+def _store_etag(url: str, etag: str, body: str) -> None:
+    supabase = get_supabase()
+    try:
+        supabase.table("github_etag_cache").upsert({
+            "url": url,
+            "etag": etag,
+            "body": body,
+            "fetched_at": datetime.now(timezone.utc).isoformat()
+        }).execute()
+    except Exception as e:
+        print(f"ETag cache store failed for {url}: {e}")
+
+def _load_analysis(cache_key: str) -> Optional[dict]:
+    supabase = get_supabase()
+    try:
+        res = supabase.table("repo_analysis_cache").select("result").eq("cache_key", cache_key).limit(1).execute()
+    except Exception as e:
+        print(f"Analysis cache lookup failed: {e}")
+        return None
+    return res.data[0]["result"] if res.data else None
+
+def _store_analysis(cache_key: str, result: dict) -> None:
+    supabase = get_supabase()
+    try:
+        supabase.table("repo_analysis_cache").upsert({"cache_key": cache_key, "result": result}).execute()
+    except Exception as e:
+        print(f"Analysis cache store failed: {e}")
+
+async def _conditional_get(client: httpx.AsyncClient, url: str) -> httpx.Response:
+    """GET with If-None-Match from the ETag cache; a 304 is answered with the cached body"""
+    supabase = get_supabase()
+    if supabase is None:
+        return await _get(client, url)
+    key = str(client.base_url.join(url))
+    cached = await asyncio.to_thread(_load_etag, key)
+    res = await _get(client, url, headers={"If-None-Match": cached["etag"]} if cached else None)
+    if res.status_code == 304 and cached:
+        # 304s don't count against the rate limit
+        return httpx.Response(200, content=cached["body"].encode("utf-8"), request=res.request)
+    etag = res.headers.get("ETag")
+    if res.status_code == 200 and etag:
+        await asyncio.to_thread(_store_etag, key, etag, res.text)
+    return res
+
+async def _list_truncated_tree(client: httpx.AsyncClient, api: str) -> list[str]:
+    """Root files plus the files under TRUNCATED_TREE_DIRS, one subtree request per directory"""
+    res = await _conditional_get(client, f"{api}/git/trees/HEAD")
+    if res.status_code != 200:
+        print(f"GitHub API error listing root tree: {res.status_code}")
+        return []
+    root = json_utils.loads(res.content).get('tree', [])
+    files = [node['path'] for node in root if node.get('type') == 'blob']
+    subtrees = [node for node in root if node.get('type') == 'tree' and node.get('path') in TRUNCATED_TREE_DIRS]
+    sem = asyncio.BoundedSemaphore(GITHUB_FETCH_CONCURRENCY)
+    
+    async def _expand(node: dict) -> list[str]:
+        async with sem:
+            try:
+                sub = await _conditional_get(client, f"{api}/git/trees/{node['sha']}?recursive=1")
+            except GitHubError as e:
+                print(e)
+                return []
+        if sub.status_code != 200:
+            print(f"GitHub API error listing {node['path']}: {sub.status_code}")
+            return []
+        return [f"{node['path']}/{n['path']}" for n in json_utils.loads(sub.content).get('tree', []) if n.get('type') == 'blob']
+    
+    for paths in await asyncio.gather(*(_expand(node) for node in subtrees)):
+        files.extend(paths)
+    return files
+
+async def _repo_size(client: httpx.AsyncClient, api: str) -> Optional[int]:
+    """Repository size in bytes as reported by GitHub, or None if it can't be read"""
+    try:
+        res = await _conditional_get(client, api)
+    except GitHubError as e:
+        print(e)
+        return None
+    if res.status_code != 200:
+        return None
+    size_kb = json_utils.loads(res.content).get('size')
+    return size_kb * 1024 if isinstance(size_kb, int) else None
+
+async def _download_zipball(client: httpx.AsyncClient, api: str) -> Optional[bytes]:
+    try:
+        res = await _get(client, f"{api}/zipball/HEAD", stream=True, follow_redirects=True)
+        try:
+            if res.status_code != 200:
+                print(f"GitHub zipball error: {res.status_code}")
+                return None
+            length = res.headers.get('Content-Length', '')
+            if length.isdigit() and int(length) > ZIPBALL_MAX_BYTES:
+                print(f"GitHub zipball larger than {ZIPBALL_MAX_BYTES} bytes, fetching files individually")
+                return None
+            buf = bytearray()
+            async for chunk in res.aiter_bytes():
+                buf.extend(chunk)
+                if len(buf) > ZIPBALL_MAX_BYTES:
+                    print(f"GitHub zipball larger than {ZIPBALL_MAX_BYTES} bytes, fetching files individually")
+                    return None
+            return bytes(buf)
+        finally:
+            await res.aclose()
+    except GhNotFound as e:
+        print(f"GitHub zipball error: {e.status_code}")
+        return None
+    except (httpx.HTTPError, GitHubError) as e:
+        print(f"GitHub zipball download failed: {e}")
+        return None
+
+def _extract_from_zipball(zip_bytes: bytes, paths: list[str]) -> dict:
+    wanted = set(paths)
+    found = {}
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            # Entries sit under a single "<owner>-<repo>-<sha>/" root
+            _, _, path = info.filename.partition('/')
+            if path.startswith('/') or '..' in path.split('/') or path not in wanted:
+                continue
+            found[path] = zf.read(info).decode('utf-8', errors='ignore')[:KEY_FILE_MAX_CHARS]
+    return {path: found[path] for path in paths if path in found}
+
+async def _fetch_raw_prefix(client: httpx.AsyncClient, url: str) -> Optional[str]:
+    """First KEY_FILE_MAX_CHARS of a file via the raw media type, reading only as many bytes as that needs"""
+    supabase = get_supabase()
+    # Raw bodies get their own cache entries, apart from the JSON representation of the same URL
+    key = str(client.base_url.join(url)) + "#raw"
+    cached = await asyncio.to_thread(_load_etag, key) if supabase is not None else None
+    headers = {"Accept": "application/vnd.github.raw"}
+    if cached:
+        headers["If-None-Match"] = cached["etag"]
+    # UTF-8 needs at most 4 bytes per character
+    max_bytes = KEY_FILE_MAX_CHARS * 4
+    buf = bytearray()
+    res = await _get(client, url, headers=headers, stream=True)
+    try:
+        if res.status_code == 304 and cached:
+            return cached["body"]
+        if res.status_code != 200:
+            return None
+        async for chunk in res.aiter_bytes():
+            buf.extend(chunk)
+            if len(buf) >= max_bytes:
+                break
+        etag = res.headers.get("ETag")
+    finally:
+        await res.aclose()
+    content = bytes(buf[:max_bytes]).decode('utf-8', errors='ignore')[:KEY_FILE_MAX_CHARS]
+    if supabase is not None and etag:
+        await asyncio.to_thread(_store_etag, key, etag, content)
+    return content
+
+async def _fetch_key_files(client: httpx.AsyncClient, api: str, paths: list[str]) -> dict:
+    sem = asyncio.BoundedSemaphore(GITHUB_FETCH_CONCURRENCY)
+    
+    async def _fetch_one(file_path: str) -> tuple[str, Optional[str]]:
+        async with sem:
+            return file_path, await _fetch_raw_prefix(client, f"{api}/contents/{file_path}")
+    
+    key_files = {}
+    results = await asyncio.gather(*(_fetch_one(p) for p in paths), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            continue
+        file_path, content = result
+        if content is not None:
+            key_files[file_path] = content
+    return key_files
+
+async def analyze_repository(repo_url: str, github_token: Optional[str] = None, cache_policy: str = "enabled", include_full_tree: bool = False) -> dict:
+    """Analyze a GitHub repository; "files" lists only the relevant files unless include_full_tree is set"""
+    supabase = get_supabase()
+    if cache_policy not in CACHE_POLICIES:
+        raise ValueError(f"cache_policy must be one of {CACHE_POLICIES}, got {cache_policy!r}")
     owner, repo = _parse_github_repo(repo_url)
     if not owner or not repo:
         return {"provider": "unknown", "files": [], "stack": [], "key_files": {}}
-    api = f"https://api.github.com/repos/{owner}/{repo}"
+    api = f"/repos/{owner}/{repo}"
     headers = {}
     token = github_token or os.getenv('GITHUB_TOKEN')
     if token:
         headers['Authorization'] = f"Bearer {token}"
     
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
+        # HTTP/2 multiplexes the concurrent contents requests over one TLS connection;
+        # auth lives on the client so every stream reuses it
+        async with httpx.AsyncClient(
+            base_url="https://api.github.com",
+            http2=True,
+            timeout=20,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            headers=headers,
+        ) as client:
             # Get repository tree
-            tree_res = await client.get(f"{api}/git/trees/HEAD?recursive=1", headers=headers)
+            try:
+                tree_res = await _conditional_get(client, f"{api}/git/trees/HEAD?recursive=1")
+            except GitHubError as e:
+                print(e)
+                return {"provider": "github", "owner": owner, "repo": repo, "files": [], "stack": [], "key_files": {}, "error": f"GitHub API error: {e.status_code}"}
             files = []
             key_files = {}
             
             if tree_res.status_code == 200:
                 try:
-                    data = tree_res.json()
+                    data = json_utils.loads(tree_res.content)
                     tree_data = data.get('tree', [])
                     
                     if isinstance(tree_data, list):
-                        for node in tree_data:
-                            if isinstance(node, dict) and node.get('type') == 'blob':
-                                path = node.get('path')
-                                if path:
-                                    files.append(path)
+                        # A truncated listing is incomplete anyway; it's replaced below.
+                        # A malformed node raises here and is reported as a parse failure
+                        if not data.get('truncated'):
+                            files = [node['path'] for node in tree_data if node.get('type') == 'blob' and node.get('path')]
                     else:
                         return {"provider": "github", "owner": owner, "repo": repo, "files": [], "stack": [], "key_files": {}, "error": f"GitHub tree response format unexpected: {type(tree_data)}"}
                 except Exception as e:
@@ -48,6 +382,21 @@ async def analyze_repository(repo_url: str, github_token: Optional[str] = None)
                 print(f"GitHub API error: {tree_res.status_code} - {tree_res.text}")
                 return {"provider": "github", "owner": owner, "repo": repo, "files": [], "stack": [], "key_files": {}, "error": f"GitHub API error: {tree_res.status_code}"}
             
+            # An unchanged tree means an unchanged analysis; checked before any subtree requests
+            cache_key = None
+            tree_sha = data.get('sha')
+            if supabase is not None and cache_policy != "disabled" and tree_sha:
+                # The full-tree variant is a different payload, so it's cached separately
+                scope = "full" if include_full_tree else "relevant"
+                cache_key = hashlib.sha256(f"{owner}/{repo}@{tree_sha}:{scope}".encode()).hexdigest()
+                cached = await asyncio.to_thread(_load_analysis, cache_key)
+                if cached is not None:
+                    return cached
+            
+            if data.get('truncated'):
+                print(f"GitHub tree for {owner}/{repo} is truncated, listing root files and source directories only")
+                files = await _list_truncated_tree(client, api)
+            
             # Expanded list of key files to fetch for better context
             key_file_names = [
                 'README.md', 'package.json', 'requirements.txt', 'pyproject.toml', 'Pipfile', 
@@ -59,95 +408,91 @@ async def analyze_repository(repo_url: str, github_token: Optional[str] = None)
                 'backend/requirements.txt', 'frontend/package.json', 'app/layout.tsx', 'app/page.tsx'
             ]
             
-            # Find relevant files from the repository structure
+            # Find relevant files from the repository structure, split into config and other files as we go
             relevant_files = []
+            config_files = []
+            other_files = []
             if isinstance(files, list) and len(files) > 0:
                 for file_path in files:
                     if isinstance(file_path, str) and file_path:
                         try:
                             file_name = file_path.split('/')[-1]
-                            # PRIORITY 1: Always include key configuration files
-                            if file_name in key_file_names or file_path in key_file_names:
-                                relevant_files.append(file_path)
-                            # PRIORITY 1.5: Always include root configuration files
-                            elif file_path in ['package.json', 'tsconfig.json', 'next.config.ts', 'next.config.js', 'tailwind.config.ts', 'tailwind.config.js']:
-                                relevant_files.append(file_path)
-                            # PRIORITY 2: Add important source files
-                            elif any(file_path.startswith(path) for path in ['src/', 'backend/', 'frontend/', 'app/', 'components/']):
-                                if any(file_path.endswith(ext) for ext in ['.tsx', '.ts', '.js', '.jsx', '.py', '.java', '.cs', '.rb']):
-                                    relevant_files.append(file_path)
+                            # Key configuration files, root configuration files, then important source files
+                            if not (
+                                file_name in key_file_names or file_path in key_file_names
+                                or file_path in ['package.json', 'tsconfig.json', 'next.config.ts', 'next.config.js', 'tailwind.config.ts', 'tailwind.config.js']
+                                or _SRC_RE.match(file_path)
+                            ):
+                                continue
+                            relevant_files.append(file_path)
+                            # Prioritize configuration files first
+                            (config_files if any(m in file_path for m in CONFIG_MARKERS) else other_files).append(file_path)
                         except Exception:
                             continue
 
             # Fetch content for key files (limit to avoid rate limits)
-            # Prioritize configuration files first
-            config_files = [f for f in relevant_files if any(config in f for config in ['package.json', 'tsconfig.json', 'next.config', 'tailwind.config'])]
-            other_files = [f for f in relevant_files if f not in config_files]
             files_to_fetch = config_files + other_files[:12]  # Ensure we get config files + up to 12 others
             
-            for file_path in files_to_fetch:
+            # One archive download instead of a request per file, for repos small enough to be worth it
+            zip_bytes = None
+            repo_size = await _repo_size(client, api)
+            if repo_size is not None and repo_size <= ZIPBALL_MAX_BYTES:
+                zip_bytes = await _download_zipball(client, api)
+            if zip_bytes is not None:
                 try:
-                    res = await client.get(f"{api}/contents/{file_path}", headers=headers)
-                    if res.status_code == 200:
-                        j = res.json()
-                        if isinstance(j, dict) and j.get('encoding') == 'base64' and j.get('content'):
-                            import base64
-                            content = base64.b64decode(j['content']).decode('utf-8', errors='ignore')
-                            key_files[file_path] = content[:1500]  # Limit content size
-                        elif isinstance(j, dict) and j.get('download_url'):
-                            raw = await client.get(j['download_url'], headers=headers)
-                            if raw.status_code == 200:
-                                key_files[file_path] = raw.text[:1500]  # Limit content size
-                except Exception:
-                    pass
-            
-            # Enhanced tech stack detection
-            stack = []
+                    key_files = await asyncio.to_thread(_extract_from_zipball, zip_bytes, files_to_fetch)
+                except zipfile.BadZipFile as e:
+                    print(f"Invalid zipball for {owner}/{repo}: {e}")
+                    zip_bytes = None
+            if zip_bytes is None:
+                key_files = await _fetch_key_files(client, api, files_to_fetch)
             
-            # Ensure files is a list before iterating
-            if isinstance(files, list):
+            # Enhanced tech stack detection: one pass over the tree collects every marker
+            found = set()
+            for f in files:
+                if not isinstance(f, str):
+                    continue
                 # Frontend frameworks
-                if any('next.config' in f for f in files if isinstance(f, str)) or any('src/app/layout.tsx' in f for f in files if isinstance(f, str)):
-                    stack.append('nextjs')
-                if any('tailwind.config' in f for f in files if isinstance(f, str)):
-                    stack.append('tailwindcss')
-                if any(f.endswith('.tsx') or f.endswith('.jsx') for f in files if isinstance(f, str)):
-                    stack.append('react')
-                if any(f.endswith('.vue') for f in files if isinstance(f, str)):
-                    stack.append('vue')
-                    
+                if 'next.config' in f or 'src/app/layout.tsx' in f:
+                    found.add('nextjs')
+                if 'tailwind.config' in f:
+                    found.add('tailwindcss')
+                if f.endswith(('.tsx', '.jsx')):
+                    found.add('react')
+                if f.endswith('.vue'):
+                    found.add('vue')
                 # Backend frameworks
-                if any(f.endswith('main.py') or f.endswith('app.py') for f in files if isinstance(f, str)):
-                    stack.append('fastapi/python')
-                if any('package.json' in f for f in files if isinstance(f, str)):
-                    stack.append('nodejs')
-                if any(f.endswith('requirements.txt') or f.endswith('pyproject.toml') for f in files if isinstance(f, str)):
-                    stack.append('python')
-                if any(f.endswith('Cargo.toml') for f in files if isinstance(f, str)):
-                    stack.append('rust')
-                if any(f.endswith('.csproj') for f in files if isinstance(f, str)):
-                    stack.append('dotnet')
-                    
+                if f.endswith(('main.py', 'app.py')):
+                    found.add('fastapi/python')
+                if 'package.json' in f:
+                    found.add('nodejs')
+                if f.endswith(('requirements.txt', 'pyproject.toml')):
+                    found.add('python')
+                if f.endswith('Cargo.toml'):
+                    found.add('rust')
+                if f.endswith('.csproj'):
+                    found.add('dotnet')
                 # Additional tools
-                if isinstance(key_files, dict) and key_files:
-                    try:
-                        if any('supabase' in str(content).lower() for content in key_files.values() if content):
-                            stack.append('supabase')
-                    except Exception:
-                        pass
-                if isinstance(files, list) and any('docker' in f.lower() for f in files if isinstance(f, str)):
-                    stack.append('docker')
+                if 'docker' in f.lower():
+                    found.add('docker')
+            
+            if any('supabase' in str(content).lower() for content in key_files.values() if content):
+                found.add('supabase')
+            stack = [name for name in STACK_ORDER if name in found]
             
-            return {
+            result = {
                 "provider": "github", 
                 "owner": owner, 
                 "repo": repo, 
-                "files": files, 
+                "files": files if include_full_tree else relevant_files, 
                 "stack": stack, 
                 "key_files": key_files,
                 "total_files": len(files) if files else 0,
                 "relevant_files_found": len(relevant_files)
             }
+            if cache_key is not None and cache_policy == "enabled":
+                await asyncio.to_thread(_store_analysis, cache_key, result)
+            return result
     
     except Exception as e:
         print(f"Unexpected error analyzing repository: {e}")
@@ -1,8 +1,24 @@
 import os
+import asyncio
+import hashlib
 import traceback
-from openai import OpenAI
+from functools import lru_cache
+from typing import Optional, Tuple
+from openai import AsyncOpenAI, OpenAI
+from utils.supabase_client import get_supabase
 
-def transcribe_audio_to_text(file_path: str) -> str:
+PLACEHOLDER_NO_API_KEY = "Transcription not available - OpenAI API key not configured"
+
+@lru_cache(maxsize=4)
+def _get_client(api_key: str) -> OpenAI:
+    return OpenAI(api_key=api_key)
+
+@lru_cache(maxsize=4)
+def _get_async_client(api_key: str) -> AsyncOpenAI:
+    return AsyncOpenAI(api_key=api_key)
+
+def _whisper_api_key(file_path: str) -> Optional[str]:
+    """Validate the audio file and return the OpenAI API key, or None if it isn't configured"""
     print(f"Starting OpenAI Whisper transcription of: {file_path}")
     
     if not os.path.exists(file_path):
@@ -18,11 +34,67 @@ def transcribe_audio_to_text(file_path: str) -> str:
     api_key = os.getenv('OPENAI_API_KEY')
     if not api_key:
         print("Warning: OpenAI API key not found, returning placeholder text")
-        return "Transcription not available - OpenAI API key not configured"
+    return api_key
+
+def _lookup_transcription(file_path: str) -> Tuple[str, Optional[str]]:
+    """Hash the audio and return (sha256, cached transcript or None)"""
+    supabase = get_supabase()
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    audio_sha = h.hexdigest()
     
+    if supabase is None:
+        return audio_sha, None
     try:
-        # Initialize OpenAI client
-        client = OpenAI(api_key=api_key)
+        res = supabase.table("transcription_cache").select("text").eq("audio_sha", audio_sha).limit(1).execute()
+    except Exception as e:
+        print(f"Transcription cache lookup failed: {e}")
+        return audio_sha, None
+    if res.data:
+        print(f"Reusing cached transcription for audio {audio_sha[:12]}")
+        return audio_sha, res.data[0]["text"]
+    return audio_sha, None
+
+def _store_transcription(audio_sha: str, text: str) -> None:
+    supabase = get_supabase()
+    if supabase is None:
+        return
+    try:
+        supabase.table("transcription_cache").upsert({"audio_sha": audio_sha, "text": text}).execute()
+    except Exception as e:
+        print(f"Transcription cache store failed: {e}")
+
+def _transcription_text(response) -> str:
+    result_text = response.text.strip()
+    print(f"Transcription completed. Text length: {len(result_text)}")
+    print(f"Transcription preview: {result_text[:100]}...")
+    
+    if not result_text:
+        return "No speech detected in audio"
+    
+    return result_text
+
+def _transcription_error(e: Exception) -> str:
+    print(f"OpenAI Whisper transcription error: {e}")
+    traceback.print_exc()
+    # Return a descriptive error instead of raising
+    return f"Transcription failed: {str(e)}"
+
+def transcribe_audio_to_text(file_path: str) -> str:
+    api_key = _whisper_api_key(file_path)
+    if not api_key:
+        return PLACEHOLDER_NO_API_KEY
+    
+    try:
+        # Re-submitted audio is answered from the cache
+        audio_sha, cached = _lookup_transcription(file_path)
+        if cached is not None:
+            return cached
+        
+        # Reuse one client per key so its connection pool outlives the call
+        client = _get_client(api_key)
         
         print("Sending audio to OpenAI Whisper API...")
         
@@ -35,17 +107,37 @@ def transcribe_audio_to_text(file_path: str) -> str:
                 # If you want to specify language, use ISO-639-1 format like "en", "es", "fr", etc.
             )
         
-        result_text = response.text.strip()
-        print(f"Transcription completed. Text length: {len(result_text)}")
-        print(f"Transcription preview: {result_text[:100]}...")
+        result_text = _transcription_text(response)
+        _store_transcription(audio_sha, result_text)
+        return result_text
+        
+    except Exception as e:
+        return _transcription_error(e)
+
+async def transcribe_audio_to_text_async(file_path: str) -> str:
+    """Same as transcribe_audio_to_text, without blocking the event loop during the upload"""
+    api_key = _whisper_api_key(file_path)
+    if not api_key:
+        return PLACEHOLDER_NO_API_KEY
+    
+    try:
+        audio_sha, cached = await asyncio.to_thread(_lookup_transcription, file_path)
+        if cached is not None:
+            return cached
+        
+        client = _get_async_client(api_key)
+        
+        print("Sending audio to OpenAI Whisper API...")
         
-        if not result_text:
-            return "No speech detected in audio"
+        with open(file_path, 'rb') as audio_file:
+            response = await client.audio.transcriptions.create(
+                model="whisper-1",
+                file=audio_file
+            )
         
+        result_text = _transcription_text(response)
+        await asyncio.to_thread(_store_transcription, audio_sha, result_text)
         return result_text
         
     except Exception as e:
-        print(f"OpenAI Whisper transcription error: {e}")
-        traceback.print_exc()
-        # Return a descriptive error instead of raising
-        return f"Transcription failed: {str(e)}"
+        return _transcription_error(e)
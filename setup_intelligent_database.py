@@ -4,12 +4,166 @@ import psycopg2
 from psycopg2.extras import execute_values
 
 
+# Every schema statement, sent to the server as one multi-statement batch
+SCHEMA_STATEMENTS = (
+    "CREATE EXTENSION IF NOT EXISTS vector;",
+    "CREATE EXTENSION IF NOT EXISTS pgcrypto;",
+    """
+    CREATE TABLE IF NOT EXISTS repository_embeddings (
+        id SERIAL PRIMARY KEY,
+        filename TEXT NOT NULL,
+        location TEXT,
+        code TEXT NOT NULL,
+        embedding halfvec(384),
+        language TEXT,
+        file_type TEXT,
+        metadata JSONB,
+        repo_url TEXT NOT NULL,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    );
+    """,
+    # fp16 storage halves the row and index size; tables created with vector(384) are converted
+    # in place, dropping the float32 HNSW index so build_embedding_index recreates it for halfvec
+    """
+    DO $$ BEGIN
+        IF (
+            SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+            WHERE attrelid = 'repository_embeddings'::regclass AND attname = 'embedding'
+        ) = 'vector(384)' THEN
+            DROP INDEX IF EXISTS repository_embeddings_embedding_hnsw;
+            DROP INDEX IF EXISTS repository_embeddings_embedding_idx;
+            ALTER TABLE repository_embeddings
+            ALTER COLUMN embedding TYPE halfvec(384) USING embedding::halfvec(384);
+        END IF;
+    END $$;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS project_metadata (
+        id SERIAL PRIMARY KEY,
+        filename TEXT NOT NULL,
+        content TEXT NOT NULL,
+        file_type TEXT,
+        repo_url TEXT NOT NULL,
+        created_at TIMESTAMPTZ DEFAULT NOW(),
+        UNIQUE(filename, repo_url)
+    );
+    """,
+    """
+    ALTER TABLE tickets
+    ADD COLUMN IF NOT EXISTS generation_method TEXT DEFAULT 'standard',
+    ADD COLUMN IF NOT EXISTS context JSONB,
+    ADD COLUMN IF NOT EXISTS raw_markdown TEXT;
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_repository_embeddings_repo_url ON repository_embeddings(repo_url);",
+    "CREATE INDEX IF NOT EXISTS idx_repository_embeddings_language ON repository_embeddings(language);",
+    "CREATE INDEX IF NOT EXISTS idx_project_metadata_repo_url ON project_metadata(repo_url);",
+    "CREATE INDEX IF NOT EXISTS idx_tickets_generation_method ON tickets(generation_method);",
+    """
+    CREATE TABLE IF NOT EXISTS context_block_sessions (
+        id UUID PRIMARY KEY,
+        user_id UUID,
+        audio_file_path TEXT,
+        full_transcription TEXT,
+        status TEXT,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS context_blocks (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        session_id UUID REFERENCES context_block_sessions(id),
+        feature_name TEXT,
+        transcript_segment TEXT,
+        specflow_intent JSONB,
+        specflow_roadmap JSONB,
+        specflow_tasks JSONB,
+        generated_ticket TEXT,
+        repository_context TEXT,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS github_etag_cache (
+        url TEXT PRIMARY KEY,
+        etag TEXT NOT NULL,
+        body TEXT,
+        fetched_at TIMESTAMPTZ DEFAULT NOW()
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS repo_analysis_cache (
+        cache_key TEXT PRIMARY KEY,
+        result JSONB NOT NULL,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transcription_cache (
+        audio_sha TEXT PRIMARY KEY,
+        text TEXT NOT NULL,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    );
+    """,
+)
+
+# HNSW graph parameters and the default search breadth (higher = better recall, slower)
+EMBEDDING_INDEX_M = 16
+EMBEDDING_INDEX_EF_CONSTRUCTION = 64
+EMBEDDING_INDEX_EF_SEARCH = 40
+
+
 def run_sql(conn, sql):
     cur = conn.cursor()
     cur.execute(sql)
     cur.close()
 
 
+def build_embedding_index(conn):
+    """Build the HNSW index on repository_embeddings (needs an autocommit connection)"""
+    cur = conn.cursor()
+    try:
+        # HNSW needs no training data, so it can be built up front and grows with inserts
+        cur.execute("SET maintenance_work_mem = '1GB';")
+        cur.execute(f"""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS repository_embeddings_embedding_hnsw
+        ON repository_embeddings USING hnsw (embedding halfvec_cosine_ops)
+        WITH (m = {EMBEDDING_INDEX_M}, ef_construction = {EMBEDDING_INDEX_EF_CONSTRUCTION});
+        """)
+        # Superseded by the HNSW index
+        cur.execute("DROP INDEX CONCURRENTLY IF EXISTS repository_embeddings_embedding_idx;")
+        # Default search breadth for new sessions
+        cur.execute(f"""
+        DO $$ BEGIN
+            EXECUTE format('ALTER DATABASE %I SET hnsw.ef_search = {EMBEDDING_INDEX_EF_SEARCH}', current_database());
+        END $$;
+        """)
+        print('Embedding index ready')
+        return True
+    finally:
+        cur.close()
+
+
+def bulk_insert_embeddings(conn, rows):
+    """Insert (filename, location, code, embedding, language, file_type, metadata, repo_url) rows in pages"""
+    cur = conn.cursor()
+    try:
+        # One multi-row INSERT per page instead of a round-trip per row; embeddings are
+        # pgvector text literals ('[v1,v2,...]') and metadata is a JSON string
+        execute_values(
+            cur,
+            """
+            INSERT INTO repository_embeddings
+            (filename, location, code, embedding, language, file_type, metadata, repo_url)
+            VALUES %s
+            """,
+            rows,
+            template="(%s, %s, %s, %s::halfvec, %s, %s, %s::jsonb, %s)",
+            page_size=1000,
+        )
+    finally:
+        cur.close()
+
+
 def setup():
     database_url = os.getenv('DATABASE_URL')
     if not database_url:
@@ -20,78 +174,10 @@ def setup():
     conn.autocommit = True
 
     try:
-        run_sql(conn, "CREATE EXTENSION IF NOT EXISTS vector;")
-        run_sql(conn, "CREATE EXTENSION IF NOT EXISTS pgcrypto;")
-
-        run_sql(conn, """
-        CREATE TABLE IF NOT EXISTS repository_embeddings (
-            id SERIAL PRIMARY KEY,
-            filename TEXT NOT NULL,
-            location TEXT,
-            code TEXT NOT NULL,
-            embedding vector(384),
-            language TEXT,
-            file_type TEXT,
-            metadata JSONB,
-            repo_url TEXT NOT NULL,
-            created_at TIMESTAMPTZ DEFAULT NOW()
-        );
-        """)
-
-        run_sql(conn, """
-        CREATE INDEX IF NOT EXISTS repository_embeddings_embedding_idx
-        ON repository_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
-        """)
-
-        run_sql(conn, """
-        CREATE TABLE IF NOT EXISTS project_metadata (
-            id SERIAL PRIMARY KEY,
-            filename TEXT NOT NULL,
-            content TEXT NOT NULL,
-            file_type TEXT,
-            repo_url TEXT NOT NULL,
-            created_at TIMESTAMPTZ DEFAULT NOW(),
-            UNIQUE(filename, repo_url)
-        );
-        """)
-
-        run_sql(conn, """
-        ALTER TABLE tickets
-        ADD COLUMN IF NOT EXISTS generation_method TEXT DEFAULT 'standard',
-        ADD COLUMN IF NOT EXISTS context JSONB,
-        ADD COLUMN IF NOT EXISTS raw_markdown TEXT;
-        """)
-
-        run_sql(conn, "CREATE INDEX IF NOT EXISTS idx_repository_embeddings_repo_url ON repository_embeddings(repo_url);")
-        run_sql(conn, "CREATE INDEX IF NOT EXISTS idx_repository_embeddings_language ON repository_embeddings(language);")
-        run_sql(conn, "CREATE INDEX IF NOT EXISTS idx_project_metadata_repo_url ON project_metadata(repo_url);")
-        run_sql(conn, "CREATE INDEX IF NOT EXISTS idx_tickets_generation_method ON tickets(generation_method);")
-
-        run_sql(conn, """
-        CREATE TABLE IF NOT EXISTS context_block_sessions (
-            id UUID PRIMARY KEY,
-            user_id UUID,
-            audio_file_path TEXT,
-            full_transcription TEXT,
-            status TEXT,
-            created_at TIMESTAMPTZ DEFAULT NOW()
-        );
-        """)
-
-        run_sql(conn, """
-        CREATE TABLE IF NOT EXISTS context_blocks (
-            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-            session_id UUID REFERENCES context_block_sessions(id),
-            feature_name TEXT,
-            transcript_segment TEXT,
-            specflow_intent JSONB,
-            specflow_roadmap JSONB,
-            specflow_tasks JSONB,
-            generated_ticket TEXT,
-            repository_context TEXT,
-            created_at TIMESTAMPTZ DEFAULT NOW()
-        );
-        """)
+        # One round-trip; the batch runs as a single implicit transaction
+        run_sql(conn, "\n".join(SCHEMA_STATEMENTS))
+        # CREATE/DROP INDEX CONCURRENTLY can't run inside the batch's transaction
+        build_embedding_index(conn)
 
         print('Setup completed')
         return True
@@ -0,0 +1,19 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def loads(data):
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can keep catching the stdlib one
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -1,9 +1,14 @@
+from functools import lru_cache
+from typing import Optional
 from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-url = os.getenv('SUPABASE_URL')
-key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-supabase: Client = create_client(url, key) if url and key else None
+@lru_cache(maxsize=1)
+def get_supabase() -> Optional[Client]:
+    """Supabase client, created on first use; None if SUPABASE_URL/SUPABASE_SERVICE_ROLE_KEY aren't set"""
+    url = os.getenv('SUPABASE_URL')
+    key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+    return create_client(url, key) if url and key else None